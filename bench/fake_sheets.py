@@ -0,0 +1,131 @@
+import re
+import threading
+import time
+from collections import Counter
+
+import pandas as pd
+
+# ==========================================
+# 메모리 구글 시트 (벤치마크용)
+# ==========================================
+# GSheetsConnection 과 같은 read / update 와, storage.GSheetsBackend 가 쓰는 gspread 워크시트 메서드
+# (row_values, col_values, batch_get, batch_update, append_rows, add_cols)와 워크시트를 찾는 메타데이터 요청을 메모리 표로 흉내 냅니다.
+# 호출마다 latency 초를 기다리고 (메서드, 워크시트)별 호출 수와 주고받은 셀 수를 셉니다.
+# worksheets=False 로 만들면 client 가 없는 연결처럼 동작해 읽고-전체-다시-쓰기 경로를 잽니다.
+
+
+def _column_number(letters):
+    number = 0
+    for ch in letters:
+        number = number * 26 + ord(ch) - 64
+    return number
+
+
+class FakeSpreadsheet:
+    def __init__(self, frames=None, latency=0.0):
+        self.latency = latency
+        self.calls = Counter()
+        self.cells = Counter()
+        self.sheets = {}
+        self._lock = threading.Lock()
+        for name, df in (frames or {}).items():
+            self.load(name, df)
+
+    def load(self, name, df):
+        values = df.astype(object).where(df.notna(), "").to_numpy().tolist()
+        self.sheets[name] = [list(map(str, df.columns))] + values
+
+    def frame(self, name):
+        header, *rows = self.sheets[name]
+        width = len(header)
+        return pd.DataFrame([(row + [""] * width)[:width] for row in rows], columns=header).replace("", None)
+
+    def api(self, method, worksheet, cells=0):
+        with self._lock:
+            self.calls[(method, worksheet)] += 1
+            self.cells[(method, worksheet)] += cells
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls.clear()
+            self.cells.clear()
+
+    def total_calls(self):
+        return sum(self.calls.values())
+
+
+class FakeWorksheet:
+    def __init__(self, book, name):
+        self.book = book
+        self.name = name
+
+    @property
+    def rows(self):
+        return self.book.sheets[self.name]
+
+    @property
+    def col_count(self):
+        return max(26, len(self.rows[0]))
+
+    def row_values(self, row):
+        self.book.api("row_values", self.name, len(self.rows[0]))
+        return list(self.rows[row - 1]) if row <= len(self.rows) else []
+
+    def col_values(self, col):
+        self.book.api("col_values", self.name, len(self.rows))
+        return [row[col - 1] if col - 1 < len(row) else "" for row in self.rows]
+
+    def batch_get(self, ranges, value_render_option=None):
+        out = []
+        for spec in ranges:
+            row = int(spec.split(":")[0])
+            out.append([list(self.rows[row - 1])] if row <= len(self.rows) else [])
+        self.book.api("batch_get", self.name, sum(len(v[0]) for v in out if v))
+        return out
+
+    def batch_update(self, data, value_input_option=None):
+        for item in data:
+            letters, row = re.match(r"([A-Z]+)(\d+)", item["range"]).groups()
+            row, col = int(row), _column_number(letters)
+            while len(self.rows) < row:
+                self.rows.append([])
+            target = self.rows[row - 1]
+            target.extend([""] * (col - len(target)))
+            target[col - 1] = item["values"][0][0]
+        self.book.api("batch_update", self.name, len(data))
+
+    def append_rows(self, values, value_input_option=None, table_range=None):
+        self.rows.extend(list(map(list, values)))
+        self.book.api("append_rows", self.name, sum(len(v) for v in values))
+
+    def add_cols(self, cols):
+        self.book.api("add_cols", self.name)
+
+
+class FakeClient:
+    def __init__(self, book):
+        self.book = book
+
+    def _select_worksheet(self, worksheet=None):
+        # gspread 는 여기서 open_by_url 과 worksheet() 두 번 메타데이터를 읽습니다.
+        self.book.api("open_by_url", worksheet)
+        self.book.api("worksheet", worksheet)
+        return FakeWorksheet(self.book, worksheet)
+
+
+class FakeGSheetsConnection:
+    def __init__(self, book, worksheets=True):
+        self.book = book
+        if worksheets:
+            self.client = FakeClient(book)
+
+    def read(self, worksheet=None, ttl=None, **kwargs):
+        df = self.book.frame(worksheet)
+        self.book.api("read", worksheet, df.size)
+        return df
+
+    def update(self, worksheet=None, data=None, **kwargs):
+        self.book.load(worksheet, data)
+        self.book.api("update", worksheet, data.size)
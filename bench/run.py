@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import holidays
+
+from bench.fake_sheets import FakeClient, FakeGSheetsConnection, FakeSpreadsheet
+from bench.synthetic import WORKERS, synthetic_catalog, synthetic_ledger, synthetic_schedule
+from export import frame_rows, schedule_rows, write_workbook
+from inventory import InventoryRepository, ItemSearchIndex, normalize_inventory, tier_styles, with_stock_status
+from ledger import LogIndex, StockLedger
+from metrics import METRICS
+from schedule import CalendarTable, RosterStats, ScheduleIndex
+from storage import GSheetsBackend, SheetCache, SheetStorage, row_updater
+from write_queue import WriteQueue, append_step, modify_step
+
+# ==========================================
+# 벤치마크
+# ==========================================
+# 구글 계정 없이 메모리 시트(bench/fake_sheets.py)와 합성 데이터(bench/synthetic.py)로
+# 로드 / 화면 계산 / 쓰기 경로의 소요 시간과 API 호출 수를 잽니다.
+#
+#   python -m bench.run                       기본(small) 규모
+#   python -m bench.run --scale large         5년 근무표, 1만 품목, 100만 로그
+#   python -m bench.run --latency 0.05        API 호출마다 50ms 지연
+#   python -m bench.run --no-gspread          gspread 워크시트 없이 읽고-전체-다시-쓰기 경로
+#   python -m bench.run --apptest             Work.py 전체 화면을 AppTest 로 실행한 시간도 잽니다
+#   python -m bench.run --output bench_output.txt --json bench.json
+
+SCALES = {
+    "small": {"years": 1, "skus": 500, "logs": 20_000},
+    "medium": {"years": 3, "skus": 2_000, "logs": 200_000},
+    "large": {"years": 5, "skus": 10_000, "logs": 1_000_000},
+}
+
+
+class Bench:
+    def __init__(self, book, repeat=3):
+        self.book = book
+        self.repeat = repeat
+        self.results = []
+
+    def measure(self, group, name, fn, repeat=None):
+        # 가장 빠른 회차의 시간과, 한 회차당 API 호출/셀 수를 기록합니다. 마지막 회차의 반환값을 돌려줍니다.
+        best, value = None, None
+        repeat = repeat or self.repeat
+        self.book.reset_counters()
+        for _ in range(repeat):
+            started = time.perf_counter()
+            value = fn()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        self.results.append({
+            "group": group,
+            "name": name,
+            "ms": round(best * 1000, 2),
+            "api_calls": self.book.total_calls() / repeat,
+            "cells": sum(self.book.cells.values()) / repeat,
+        })
+        return value
+
+    def report(self):
+        lines = [f"{'구분':<8}{'항목':<36}{'시간(ms)':>12}{'API 호출':>10}{'셀 수':>12}"]
+        for r in self.results:
+            lines.append(f"{r['group']:<8}{r['name']:<36}{r['ms']:>12,.2f}{r['api_calls']:>10.1f}{r['cells']:>12,.0f}")
+        return "\n".join(lines)
+
+
+def build_book(scale, latency, seed=0):
+    catalog = synthetic_catalog(scale["skus"], seed=seed)
+    frames = {
+        "Sheet1": synthetic_schedule(years=scale["years"], seed=seed),
+        "inventory": catalog,
+        "logs": synthetic_ledger(scale["logs"], catalog, seed=seed),
+    }
+    book = FakeSpreadsheet(frames)
+    book.latency = latency  # 데이터 준비에는 지연을 넣지 않습니다.
+    return book
+
+
+def run_core(bench, store):
+    book = bench.book
+
+    # --- 로드 ---
+    def cold_read(worksheet):
+        store.invalidate(worksheet)
+        return store.read(worksheet)
+
+    schedule_df = bench.measure("load", "Sheet1 읽기 (캐시 없음)", lambda: cold_read("Sheet1"))
+    inventory_df = bench.measure("load", "inventory 읽기 (캐시 없음)", lambda: cold_read("inventory"))
+    logs_df = bench.measure("load", "logs 읽기 (캐시 없음)", lambda: cold_read("logs"))
+    bench.measure("load", "캐시 적중 읽기 x100", lambda: [store.read("logs") for _ in range(100)])
+    schedule_index = bench.measure("load", "ScheduleIndex.from_frame", lambda: ScheduleIndex.from_frame(schedule_df, WORKERS))
+    status_df = bench.measure("load", "재고 현황 계산", lambda: with_stock_status(normalize_inventory(inventory_df)))
+    bench.measure("load", "InventoryRepository.from_frame", lambda: InventoryRepository.from_frame(inventory_df))
+    search_index = bench.measure("load", "ItemSearchIndex.from_frame", lambda: ItemSearchIndex.from_frame(inventory_df))
+    ledger = bench.measure("load", "StockLedger.from_frame", lambda: StockLedger.from_frame(logs_df, inventory_df))
+    log_index = bench.measure("load", "LogIndex.from_frame", lambda: LogIndex.from_frame(logs_df))
+    roster = bench.measure("load", "RosterStats", lambda: RosterStats(schedule_index))
+
+    # --- 화면 계산 ---
+    today = date.today()
+    calendar_table = bench.measure(
+        "render", "CalendarTable.build (10년)",
+        lambda: CalendarTable.build(today.year - 8, today.year + 1, holidays.KR(language="ko", years=range(today.year - 8, today.year + 2))),
+    )
+    last_year = int(schedule_df["date"].iloc[-1][:4])
+    bench.measure("render", "월 마스크 + 근무자 통계 x12", lambda: [schedule_index.counts(schedule_index.month(last_year, m)) for m in range(1, 13)])
+    bench.measure("render", "연간 리포트 (월/분기/요일/연속/공정성)", lambda: roster.report(last_year, WORKERS))
+    view_cols = ["품목코드", "품목명", "수량", "보유 재고(박스 환산)", "제조 가능 음료수(추산)", "비고"]
+    bench.measure("render", "재고 표 경고 스타일 계산", lambda: status_df[view_cols].style.apply(tier_styles, tiers=status_df["_tier"], axis=None)._compute())
+    queries = ["원두", "ㅇㄷ", "SKU0001", "라떼", "가", "크림 1"] * 4
+    bench.measure("render", f"품목 검색 x{len(queries)}", lambda: [search_index.search(q) for q in queries])
+    first, last = log_index.span()
+    bench.measure("render", "로그 필터 + 1페이지 (50행)", lambda: logs_df.iloc[log_index.query(first, last, action="출고 (-)")[:50]])
+    bench.measure("render", "시점 재고 (전 품목)", lambda: ledger.stock_at(first + (last - first) / 2, inventory_df))
+    bench.measure("render", "기간 소비량 (주 단위)", lambda: ledger.consumption(first, last, "W"))
+
+    # --- 내보내기 ---
+    year_days = calendar_table.span(date(today.year, 1, 1), date(today.year, 12, 31))
+    bench.measure("export", "연간 근무표 + 통계 시트", lambda: write_workbook(
+        [("근무표", ["날짜", "요일", "근무자", "비고"], schedule_rows(schedule_index, year_days))]
+        + [(title, list(t.columns), frame_rows(t)) for title, t in roster.report(today.year, WORKERS)]
+    ), repeat=1)
+    bench.measure("export", "재고 현황", lambda: write_workbook([("재고현황", view_cols, frame_rows(status_df[view_cols]))]), repeat=1)
+
+    # --- 쓰기 ---
+    dates = list(schedule_df["date"].iloc[-20:])
+    merge_spec = {"op": "merge_list", "col": "workers", "added": [WORKERS[0]], "removed": [], "base": []}
+    bench.measure("write", "근무 배정 저장 (20일, 1회 요청)", lambda: store.modify_rows(
+        "Sheet1", "date", {d: row_updater(merge_spec, []) for d in dates}, insert_missing=True
+    ), repeat=1)
+
+    codes = list(inventory_df["품목코드"].iloc[:10])
+    log_columns = list(logs_df.columns)
+
+    def movement_steps(code, amount):
+        row = {"일시": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "작업구분": "입고 (+)", "품목코드": code, "변동량": amount, "단위": "개"}
+        return [
+            modify_step("inventory", "품목코드", {code: [{"op": "add", "col": "수량", "amount": amount, "minimum": 0}]}, version_col="버전"),
+            append_step("logs", [row], log_columns),
+        ]
+
+    queue = WriteQueue(store, window=0.05)
+
+    def submit_and_drain(jobs):
+        for steps in jobs:
+            queue.submit(steps, "bench")
+        queue.drain(timeout=600)
+
+    bench.measure("write", "재고 입출고 1건 (수량+로그)", lambda: submit_and_drain([movement_steps(codes[0], 1)]), repeat=1)
+    bench.measure("write", "재고 입출고 10건 (쓰기 큐 병합)", lambda: submit_and_drain([movement_steps(c, 1) for c in codes]), repeat=1)
+    return book
+
+
+def run_apptest(bench, book):
+    # Work.py 를 AppTest 로 실행합니다. streamlit_gsheets 연결을 메모리 시트로 바꿔 끼웁니다.
+    import streamlit_gsheets
+    from streamlit.testing.v1 import AppTest
+
+    fake = FakeGSheetsConnection(book)
+    streamlit_gsheets.GSheetsConnection._connect = lambda self, **kwargs: None
+    streamlit_gsheets.GSheetsConnection.read = lambda self, *a, **k: fake.read(*a, **k)
+    streamlit_gsheets.GSheetsConnection.update = lambda self, *a, **k: fake.update(*a, **k)
+    streamlit_gsheets.GSheetsConnection.client = property(lambda self: FakeClient(book))
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Work.py")
+
+    at = AppTest.from_file(script, default_timeout=600)
+    bench.measure("apptest", "근무 일정 화면 (첫 실행)", at.run, repeat=1)
+    bench.measure("apptest", "근무 일정 화면 (재실행)", at.run)
+    at.sidebar.radio[0].set_value("📅 달력 보기 (PC)")
+    bench.measure("apptest", "달력 보기 (재실행)", at.run)
+    at.switch_page("views/inventory_view.py")
+    bench.measure("apptest", "재고 화면 (첫 실행)", at.run, repeat=1)
+    bench.measure("apptest", "재고 화면 (재실행)", at.run)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="근무/재고 관리 앱 벤치마크")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--latency", type=float, default=0.0, help="API 호출마다 넣을 지연(초)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-gspread", action="store_true", help="gspread 워크시트 없이 읽고-전체-다시-쓰기 경로를 잽니다")
+    parser.add_argument("--apptest", action="store_true", help="Work.py 전체 화면 실행 시간도 잽니다")
+    parser.add_argument("--output", help="결과 표를 저장할 텍스트 파일")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    args = parser.parse_args(argv)
+
+    scale = SCALES[args.scale]
+    started = time.perf_counter()
+    book = build_book(scale, args.latency)
+    print(f"데이터 준비: {args.scale} {scale} ({time.perf_counter() - started:.1f}초)")
+
+    bench = Bench(book, repeat=args.repeat)
+    store = SheetStorage(GSheetsBackend(FakeGSheetsConnection(book, worksheets=not args.no_gspread)), SheetCache(ttl_seconds=3600))
+    run_core(bench, store)
+    if args.apptest:
+        run_apptest(bench, book)
+
+    report = bench.report()
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(f"scale={args.scale} latency={args.latency} gspread={not args.no_gspread}\n{report}\n")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"scale": args.scale, "latency": args.latency, "results": bench.results, "metrics": METRICS.snapshot()}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
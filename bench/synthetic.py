@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from ledger import LEDGER_COLUMNS, TIME_FORMAT
+
+# ==========================================
+# 합성 데이터 생성기 (벤치마크용)
+# ==========================================
+# 같은 seed 면 같은 데이터가 나오므로 실행 결과를 서로 비교할 수 있습니다.
+
+WORKERS = ["김채영", "임예린", "조가율", "이지영", "이혁", "이레"]
+
+
+def synthetic_schedule(years=3, workers=WORKERS, per_day=2, start=date(2024, 1, 1), seed=0):
+    # Sheet1 형식 (date, workers). 월/일요일을 제외한 모든 날에 per_day 명씩 배정합니다.
+    rng = np.random.default_rng(seed)
+    days = pd.date_range(start, start + timedelta(days=365 * years - 1), freq="D")
+    days = days[~days.weekday.isin([0, 6])]
+    picks = np.argsort(rng.random((len(days), len(workers))), axis=1)[:, :per_day]
+    names = np.array(workers, dtype=object)[picks]
+    return pd.DataFrame({"date": days.strftime("%Y-%m-%d"), "workers": [",".join(row) for row in names]})
+
+
+def synthetic_catalog(size=10_000, seed=0):
+    # inventory 형식. 품목명은 한글 음절을 섞어 검색/초성 색인이 실제와 비슷한 분포가 되게 합니다.
+    rng = np.random.default_rng(seed)
+    syllables = np.array(list("가나다라마바사아자차카타파하원두우유시럽컵빨대얼음크림초코바닐라녹차"), dtype=object)
+    picks = syllables[rng.integers(0, len(syllables), size=(size, 4))]
+    names = [f"{''.join(p)} {i}" for i, p in enumerate(picks)]
+    return pd.DataFrame({
+        "품목코드": [f"SKU{i:06d}" for i in range(size)],
+        "품목명": names,
+        "수량": rng.integers(0, 500, size),
+        "비고": "",
+        "박스당수량": rng.choice([1, 6, 12, 24], size),
+        "개당음료수": rng.choice([0, 1, 2, 10], size),
+        "버전": 0,
+    })
+
+
+def synthetic_ledger(rows=1_000_000, catalog=None, start=date(2022, 1, 1), seed=0):
+    # logs(원장) 형식. 시간 순으로 입고/출고가 섞인 행을 만듭니다.
+    rng = np.random.default_rng(seed)
+    catalog = synthetic_catalog(seed=seed) if catalog is None else catalog
+    items = rng.integers(0, len(catalog), rows)
+    outgoing = rng.random(rows) < 0.7
+    qty = rng.integers(1, 50, rows)
+    seconds = np.sort(rng.integers(0, 86400 * 365 * 3, rows))
+    times = pd.Timestamp(start) + pd.to_timedelta(seconds, unit="s")
+    delta = np.where(outgoing, -qty, qty)
+    action = np.where(outgoing, "출고 (-)", "입고 (+)")
+    frame = pd.DataFrame({
+        "일시": times.strftime(TIME_FORMAT),
+        "작업구분": action,
+        "품목코드": catalog["품목코드"].to_numpy()[items],
+        "품목명": catalog["품목명"].to_numpy()[items],
+        "변동량": delta,
+        "단위": "개",
+        "내용": pd.Series(action).str[:2] + ": " + pd.Series(qty).astype(str) + "개(낱개) | 사유: 벤치마크",
+        "작업자": "관리자",
+    })
+    return frame[LEDGER_COLUMNS]
@@ -0,0 +1,219 @@
+import logging
+import os
+
+import pandas as pd
+import streamlit as st
+
+from inventory import INVENTORY_COLUMNS, InventoryRepository, ItemSearchIndex, normalize_inventory, with_stock_status
+from ledger import LEDGER_COLUMNS, LogIndex, StockLedger, ledger_row
+from schedule import CalendarTable, RosterStats, ScheduleIndex
+from storage import GSheetsBackend, MirroredBackend, SQLiteBackend, SheetStorage
+from write_queue import DONE, FAILED, PARTIAL, WriteQueue, append_step
+
+# ==========================================
+# 페이지 공통: 저장소 연결, 데이터 로드, 쓰기 제출
+# ==========================================
+# Work.py(메뉴와 사이드바)와 views/ 아래 각 페이지가 함께 씁니다.
+# 저장소 엔진, 쓰기 큐, 달력 표처럼 무거운 자원은 st.cache_resource 로 프로세스당 하나만 만들고,
+# 실제로 그 자원을 쓰는 페이지가 처음 열릴 때 만들어집니다.
+
+ADMIN_PASSWORD = "1234"
+
+LOG_COLUMNS = LEDGER_COLUMNS
+SHEET_SCHEMAS = {"Sheet1": ["date", "workers"], "inventory": INVENTORY_COLUMNS + ["버전"], "logs": LOG_COLUMNS}
+SHEET_INDEXES = {"Sheet1": ["date"], "inventory": ["품목코드", "품목명"], "logs": ["품목코드", "품목명"]}
+
+# 저장소 엔진은 .streamlit/secrets.toml 의 [storage] 항목이나 환경변수로 고릅니다.
+#   engine = "gsheets"  (기본값) 구글 시트를 직접 읽고 씁니다.
+#   engine = "sqlite"   로컬 SQLite 파일(path, 기본 data/schedule.db)을 주 저장소로 씁니다.
+#   mirror = true       sqlite 사용 시 구글 시트에도 백그라운드로 따라 씁니다 (처음 실행 때 시트 내용을 가져옵니다).
+#                       반영되지 못한 워크시트는 sheet_mirror.json 에 남아 다음 실행 때 로컬 내용으로 다시 맞춥니다.
+#   cache_ttl = 180     공유 캐시 유지 시간(초). 성능 패널의 적중률/만료 횟수를 보고 조정합니다.
+# 환경변수 SCHEDULE_STORAGE_ENGINE / SCHEDULE_STORAGE_PATH / SCHEDULE_STORAGE_MIRROR / SCHEDULE_CACHE_TTL 가 있으면 그 값을 우선합니다.
+def storage_settings():
+    try:
+        settings = dict(st.secrets.get("storage", {}))
+    except Exception:
+        settings = {}
+    return {
+        "engine": os.environ.get("SCHEDULE_STORAGE_ENGINE", settings.get("engine", "gsheets")),
+        "path": os.environ.get("SCHEDULE_STORAGE_PATH", settings.get("path", "data/schedule.db")),
+        "mirror": str(os.environ.get("SCHEDULE_STORAGE_MIRROR", settings.get("mirror", False))).lower() in ("1", "true", "yes"),
+        "cache_ttl": float(os.environ.get("SCHEDULE_CACHE_TTL", settings.get("cache_ttl", 180))),
+    }
+
+@st.cache_resource
+def open_storage_backend():
+    # 엔진과 미러 스레드는 프로세스당 하나만 만들어 모든 세션이 공유합니다.
+    # 구글 시트 연결 패키지(gspread/google-auth)는 가져오는 데만 수백 ms 가 걸리므로 시트를 쓸 때만 불러옵니다.
+    settings = storage_settings()
+    if settings["engine"] != "sqlite":
+        from streamlit_gsheets import GSheetsConnection
+        return GSheetsBackend(st.connection("gsheets", type=GSheetsConnection))
+    local = SQLiteBackend(settings["path"], schemas=SHEET_SCHEMAS, indexes=SHEET_INDEXES)
+    if not settings["mirror"]:
+        return local
+    from streamlit_gsheets import GSheetsConnection
+    state = os.path.join(os.path.dirname(settings["path"]) or ".", "sheet_mirror.json")
+    backend = MirroredBackend(local, GSheetsBackend(st.connection("gsheets", type=GSheetsConnection)), state_path=state)
+    backend.bootstrap(SHEET_SCHEMAS)
+    return backend
+
+@st.cache_resource
+def get_store():
+    store = SheetStorage(open_storage_backend())
+    store.cache.ttl_seconds = storage_settings()["cache_ttl"]
+    return store
+
+@st.cache_resource
+def open_perf_log(target):
+    # 환경변수 SCHEDULE_PERF_LOG 가 있으면 화면 실행마다 구간 기록을 JSON 한 줄로 남깁니다 ("stderr" 또는 파일 경로).
+    handler = logging.StreamHandler() if target == "stderr" else logging.FileHandler(target, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    perf_logger = logging.getLogger("metrics")
+    perf_logger.addHandler(handler)
+    perf_logger.setLevel(logging.INFO)
+    return handler
+
+@st.cache_resource
+def open_write_queue():
+    # 쓰기는 화면 스크립트가 아니라 프로세스당 하나인 백그라운드 큐가 처리합니다 (write_queue.py 참고).
+    journal = os.path.join(os.path.dirname(storage_settings()["path"]) or ".", "write_queue.jsonl")
+    return WriteQueue(get_store(), journal_path=journal)
+
+# 시트 데이터는 storage 의 프로세스 공유 캐시(기본 3분)에 워크시트당 한 벌만 보관되며,
+# 세션마다 사본을 따로 두지 않고 읽기 전용 뷰와 파생 객체를 나눠 씁니다.
+
+# --- [DB 함수] 1. 근무 일정 데이터 로드 ---
+# 행 단위 반복 없이 workers 열 전체를 한 번에 split/explode 하여 날짜별 비트마스크 색인(ScheduleIndex)으로 만듭니다.
+def load_schedule_data():
+    try:
+        return get_store().derived("Sheet1", "index", lambda df: ScheduleIndex.from_frame(df, WORKER_COLORS))
+    except:
+        return ScheduleIndex.from_frame(None, WORKER_COLORS)
+
+def load_roster_stats():
+    # 전체 근무 기록을 (날짜 x 근무자) 표로 펼친 통계 엔진. 근무 일정이 바뀔 때만 다시 만들어집니다.
+    try:
+        return get_store().derived("Sheet1", "stats", lambda df: RosterStats(load_schedule_data()))
+    except:
+        return RosterStats(ScheduleIndex.from_frame(None, WORKER_COLORS))
+
+# --- [DB 함수] 2. 재고 및 로그 데이터 로드 ---
+def load_inventory_data():
+    # 재고 현황(박스 환산, 음료수 추산, 경고 단계) 열까지 붙인 결과를 인벤토리가 바뀔 때만 계산해 공유합니다.
+    df_inv = with_stock_status(normalize_inventory(pd.DataFrame(columns=INVENTORY_COLUMNS)))
+    df_logs = pd.DataFrame(columns=LOG_COLUMNS)
+    
+    try:
+        df_inv = get_store().derived("inventory", "status", lambda df: with_stock_status(normalize_inventory(df))).copy(deep=False)
+    except:
+        st.sidebar.error("⚠️ 구글 시트에서 'inventory' 탭을 찾을 수 없습니다.")
+        
+    try:
+        df_logs = get_store().read("logs")
+    except:
+        st.sidebar.error("⚠️ 구글 시트에서 'logs' 탭을 찾을 수 없습니다.")
+        
+    return df_inv, df_logs
+
+def load_inventory_repository():
+    # 품목코드/품목명 -> 행 위치 색인. 쓰기 후에는 바뀐 행만 반영되어 이어서 쓰입니다.
+    try:
+        return get_store().derived("inventory", "repository", InventoryRepository.from_frame)
+    except:
+        return InventoryRepository.from_frame(None)
+
+def load_search_index():
+    # 인벤토리가 바뀔 때만 다시 만들어지는 품목명/품목코드/초성 검색 색인
+    try:
+        return get_store().derived("inventory", "search", ItemSearchIndex.from_frame)
+    except:
+        return ItemSearchIndex([], [])
+
+def load_stock_ledger(df_inv):
+    # 수불 로그(원장)가 바뀔 때만 다시 만들어지고, 새 로그 행은 이어 붙여지는 품목별 시간 순 변동량 배열
+    try:
+        return get_store().derived("logs", "ledger", lambda df: StockLedger.from_frame(df, df_inv))
+    except:
+        return StockLedger.empty()
+
+def load_log_index():
+    # 일시 정렬 + 품목명/작업구분별 색인. 새 로그 행은 이어 붙여지므로 로그 화면은 현재 페이지 행만 꺼냅니다.
+    try:
+        return get_store().derived("logs", "index", LogIndex.from_frame)
+    except:
+        return LogIndex.from_frame(None)
+
+# --- [DB 함수] 3. 수불 원장 기록 단계 (시트 전체를 다시 쓰지 않고 새 행만 덧붙임) ---
+def log_step(df_logs, action, item_code, item_name, delta, content):
+    # 기존 시트 헤더 순서를 유지하고, 아직 없는 원장 열(품목코드/변동량/단위)은 뒤에 추가합니다.
+    columns = list(df_logs.columns) + [c for c in LOG_COLUMNS if c not in df_logs.columns]
+    return append_step("logs", [ledger_row(action, item_code, item_name, delta, content)], columns)
+
+# --- [DB 함수] 4. 쓰기 작업 제출 및 결과 알림 ---
+# 제출한 작업 id 와 완료 시 보여 줄 문구를 세션에 보관해 두고, 사이드바 조각(fragment)이 2초마다 상태를 확인합니다.
+# 문구는 str.format 틀이므로 품목명 같은 사용자 입력은 틀에 직접 넣지 말고 fields 로 넘깁니다 (중괄호가 든 이름 대비).
+def submit_write(steps, label, success, conflict=None, stale=None, fields=None):
+    ticket = open_write_queue().submit(steps, label)
+    st.session_state.setdefault("write_tickets", {})[ticket] = {
+        "label": label, "success": success, "conflict": conflict, "stale": stale, "fields": dict(fields or {}),
+    }
+    st.toast(f"⏳ {label} 요청을 접수했습니다.")
+    return ticket
+
+def write_status_message(notice, job):
+    # 완료 문구의 {keys} 는 충돌/stale 키 목록, {row} 는 작업이 반영한 첫 행이고, 나머지는 제출 때 넘긴 fields 입니다.
+    fields = dict(notice.get("fields", {}), rows=job["rows"], row=next(iter(job["rows"].values()), {}))
+    if job["status"] == FAILED:
+        return "error", f"❌ {notice['label']} 실패: {job['error']}"
+    if job["status"] == PARTIAL:
+        return "error", f"⚠️ {notice['label']} 일부만 반영됨: {job['error']}"
+    if job["conflicts"] and notice["conflict"]:
+        return "warning", notice["conflict"].format(keys=", ".join(job["conflicts"]), **fields)
+    if job["stale"] and notice["stale"]:
+        return "warning", notice["stale"].format(keys=", ".join(job["stale"]), **fields)
+    return "success", notice["success"].format(**fields)
+
+@st.fragment(run_every=2)
+def write_status_panel():
+    tickets = st.session_state.setdefault("write_tickets", {})
+    finished = False
+    for ticket, notice in list(tickets.items()):
+        job = open_write_queue().status(ticket)
+        if job is None:
+            # 큐가 오래된 작업을 정리했거나 서버가 다시 시작되어 큐를 새로 만든 경우입니다. 더 기다려도 결과가 오지 않습니다.
+            message = f"❔ {notice['label']}: 작업 상태를 확인할 수 없습니다. 반영 여부를 화면에서 확인해 주세요."
+            st.toast(message)
+            st.session_state.setdefault("write_failures", []).append(message)
+            del tickets[ticket]
+            finished = True
+            continue
+        if job["status"] not in (DONE, FAILED, PARTIAL):
+            st.caption(f"⏳ 반영 중: {notice['label']}" + (f" (재시도 대기: {job['error']})" if job["error"] else ""))
+            continue
+        level, message = write_status_message(notice, job)
+        st.toast(message)
+        if level == "error":
+            st.session_state.setdefault("write_failures", []).append(message)
+        del tickets[ticket]
+        finished = True
+    if finished:
+        # 공유 캐시는 쓰기 직후 갱신되어 있으므로, 전체 화면을 다시 그리기만 하면 최신 값이 보입니다.
+        st.rerun(scope="app")
+
+WORKER_COLORS = {
+    "김채영": "#FFD700", "임예린": "#FFB6C1", "조가율": "#98FB98", 
+    "이지영": "#ADD8E6", "이혁": "#E6E6FA", "이레": "#FFCC99"
+}
+
+@st.cache_resource
+def load_calendar(first_year, last_year):
+    # 연도 범위마다 한 번만 만들어 모든 세션이 공유하는 날짜별 요일/휴무/공휴일/달력 칸 표
+    # 공휴일 패키지는 근무 일정 화면을 처음 열 때만 불러옵니다.
+    import holidays
+    return CalendarTable.build(first_year, last_year, holidays.KR(language='ko', years=range(first_year, last_year + 1)))
+
+def check_admin():
+    # 사이드바의 관리자 비밀번호 입력값(세션 상태)으로 판단합니다.
+    return st.session_state.get("admin_password") == ADMIN_PASSWORD
@@ -0,0 +1,129 @@
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from metrics import METRICS
+from storage import to_cell
+
+# ==========================================
+# 엑셀 내보내기
+# ==========================================
+# 다운로드 버튼에는 파일 내용 대신 "누르면 만드는 함수" 를 넘기므로, 화면을 다시 그릴 때마다 통합문서를 만들지 않습니다.
+# 만든 파일은 내용 해시를 키로 프로세스 공유 캐시에 보관해, 같은 내용을 여러 번 받아도 한 번만 만듭니다.
+# 통합문서는 openpyxl 쓰기 전용(write_only) 모드로 행을 흘려 써서 셀 객체를 쌓아 두지 않습니다.
+# 완성된 xlsx 파일(압축된 바이트)은 다운로드 버튼과 캐시가 그대로 쓰므로 메모리에 둡니다.
+# openpyxl 은 가져오는 데만 0.1초 넘게 걸리므로 첫 내보내기 때 불러옵니다.
+
+EXCEL_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+CHUNK_ROWS = 5000
+
+
+class ExportCache:
+    def __init__(self, max_entries=32, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            data = self._files.get(key)
+            if data is not None:
+                self._files.move_to_end(key)
+                METRICS.count("export_cache_requests", result="hit")
+                return data
+        METRICS.count("export_cache_requests", result="miss")
+        with METRICS.span("export.write_workbook"):
+            data = build()
+        METRICS.count("export_bytes", len(data))
+        with self._lock:
+            self._files[key] = data
+            while len(self._files) > 1 and (
+                len(self._files) > self.max_entries or sum(len(v) for v in self._files.values()) > self.max_bytes
+            ):
+                self._files.popitem(last=False)
+        return data
+
+
+EXPORT_CACHE = ExportCache()
+
+
+def content_hash(*parts):
+    # DataFrame 은 열 단위 해시(hash_pandas_object)로, numpy 배열은 바이트로, 나머지는 문자열로 이어 붙여 해시합니다.
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            digest.update("|".join(map(str, part.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(part.astype(str), index=False).to_numpy().tobytes())
+        elif isinstance(part, np.ndarray):
+            digest.update(part.tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def write_workbook(sheets):
+    # sheets: [(시트 이름, 헤더, 행 iterable)] -> xlsx 바이트. 행은 만들어지는 대로 써서 셀 단위 통합문서 모델을 만들지 않습니다.
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for title, header, rows in sheets:
+        sheet = workbook.create_sheet(title=title[:31])
+        sheet.append(list(header))
+        for row in rows:
+            sheet.append([_excel_cell(v) for v in row])
+    buffer = BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def _excel_cell(value):
+    value = to_cell(value)
+    return "" if value is pd.NA or value is pd.NaT else value
+
+
+def frame_rows(df):
+    # DataFrame 을 CHUNK_ROWS 행씩 잘라 튜플로 흘려 보냅니다 (전체를 한 번에 파이썬 객체로 바꾸지 않음).
+    for lo in range(0, len(df), CHUNK_ROWS):
+        yield from df.iloc[lo:lo + CHUNK_ROWS].itertuples(index=False, name=None)
+
+
+def schedule_rows(schedule_index, days):
+    # days(달력 표 구간)의 (날짜, 요일, 근무자, 비고) 행
+    masks = schedule_index.span(days["date"].iloc[0], days["date"].iloc[-1])
+    for iso, label, holiday, mask in zip(days["iso"], days["weekday_label"], days["holiday"], masks):
+        yield iso, label, ", ".join(schedule_index.decode(mask)), holiday
+
+
+# --- 다운로드 버튼용 지연 생성 함수 ---
+# 반환값은 인자 없는 함수이며, 사용자가 버튼을 누를 때 별도 스레드에서 호출됩니다 (Streamlit 명령 사용 불가).
+
+def schedule_export(schedule_index, days, sheet_name="근무표", extra_sheets=None):
+    # days 는 달력 표(CalendarTable)의 구간입니다. extra_sheets 는 [(시트 이름, 표)] 를 돌려주는 함수로, 버튼을 누를 때만 계산됩니다.
+    header = ["날짜", "요일", "근무자", "비고"]
+
+    def build():
+        first, last = days["date"].iloc[0], days["date"].iloc[-1]
+        key = content_hash("schedule", sheet_name, first, last, schedule_index.workers, schedule_index.span(first, last), extra_sheets is not None)
+
+        def write():
+            sheets = [(sheet_name, header, schedule_rows(schedule_index, days))]
+            for title, table in (extra_sheets() if extra_sheets else []):
+                sheets.append((title, list(table.columns), frame_rows(table)))
+            return write_workbook(sheets)
+        return EXPORT_CACHE.get(key, write)
+    return build
+
+
+def frame_export(df, sheet_name):
+    # df 대신 프레임을 돌려주는 함수를 넘기면 필터 결과 같은 큰 프레임도 버튼을 누를 때만 만듭니다.
+    def build():
+        frame = df() if callable(df) else df
+        key = content_hash("frame", sheet_name, frame)
+        return EXPORT_CACHE.get(key, lambda: write_workbook([(sheet_name, list(frame.columns), frame_rows(frame))]))
+    return build
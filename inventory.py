@@ -0,0 +1,240 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from storage import WriteConflict, cell_key, to_cell
+
+# ==========================================
+# 재고 현황 계산
+# ==========================================
+# 박스 환산, 제조 가능 음료수, 재고 경고 단계를 행 단위 apply 없이 열 전체 연산으로 계산합니다.
+# 결과는 인벤토리 시트가 바뀔 때만 한 번 계산되어 공유 캐시에 보관되고,
+# 재고 조회 표/경고 문구/내보내기가 같은 결과를 나눠 씁니다.
+
+INVENTORY_COLUMNS = ["품목코드", "품목명", "수량", "비고", "박스당수량", "개당음료수"]
+NUMERIC_COLUMNS = ["수량", "박스당수량", "개당음료수", "버전"]
+
+LOW_STOCK_DRINKS = 10
+WARN_STOCK_DRINKS = 30
+EXCLUDED_DRINKS = 999999  # 음료수 계산 제외품은 경고 대상이 되지 않도록 큰 값으로 둡니다.
+
+# 경고 단계: 0 정상, 1 부족 주의(30잔 이하), 2 고갈 위험(10잔 이하)
+TIER_OK, TIER_WARN, TIER_LOW = 0, 1, 2
+TIER_STYLES = {
+    TIER_OK: "",
+    TIER_WARN: "background-color: #fff3bf; color: #e67e22;",
+    TIER_LOW: "background-color: #ffdde1; color: #c92a2a; font-weight: bold;",
+}
+
+
+def normalize_inventory(df):
+    df = df.copy()
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0).astype(int)
+        else:
+            df[col] = 0
+    return df
+
+
+def with_stock_status(df):
+    # 정규화된 인벤토리에 "보유 재고(박스 환산)", "제조 가능 음료수(추산)", "_raw_drinks", "_tier" 열을 붙입니다.
+    df = df.copy()
+    qty = df["수량"].to_numpy(dtype=np.int64)
+    box_unit = df["박스당수량"].to_numpy(dtype=np.int64)
+    ratio = df["개당음료수"].to_numpy(dtype=np.int64)
+
+    has_box = box_unit > 0
+    boxes, rest = np.divmod(qty, np.where(has_box, box_unit, 1))
+    box_text = pd.Series(boxes, index=df.index).astype(str) + "박스 (+" + pd.Series(rest, index=df.index).astype(str) + "개)"
+    df["보유 재고(박스 환산)"] = box_text.where(has_box, pd.Series(qty, index=df.index).astype(str) + "개")
+
+    has_ratio = ratio > 0
+    raw_drinks = np.where(has_ratio, qty * ratio, EXCLUDED_DRINKS)
+    drink_text = pd.Series(raw_drinks, index=df.index).map("{:,} 잔".format)
+    df["제조 가능 음료수(추산)"] = drink_text.where(has_ratio, "❌ [계산 제외품]")
+    df["_raw_drinks"] = raw_drinks
+    df["_tier"] = np.select(
+        [raw_drinks <= LOW_STOCK_DRINKS, raw_drinks <= WARN_STOCK_DRINKS],
+        [TIER_LOW, TIER_WARN],
+        TIER_OK,
+    )
+    return df
+
+
+def tier_styles(view_df, tiers):
+    # Styler.apply(axis=None) 용: 행마다 경고 단계에 맞는 CSS 를 모든 열에 한 번에 채웁니다.
+    css = pd.Series(tiers, index=view_df.index).map(TIER_STYLES).to_numpy()
+    return pd.DataFrame(np.repeat(css[:, None], view_df.shape[1], axis=1), index=view_df.index, columns=view_df.columns)
+
+
+# ==========================================
+# 품목 검색 색인
+# ==========================================
+# 품목명/품목코드/품목명 초성을 2글자(n-gram) 역색인으로 만들어 두고, 입력값을 정규식이 아닌 글자 그대로 찾습니다.
+# 인벤토리가 바뀔 때만 다시 만들어지며, 키 입력마다 전체 열을 훑지 않고 후보 행만 확인합니다.
+
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+
+
+def to_choseong(text):
+    # "아메리카노 원두" -> "ㅇㅁㄹㅋㄴ ㅇㄷ" (한글 음절만 초성으로 바꾸고 나머지 글자는 그대로 둡니다)
+    out = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        out.append(CHOSEONG[code // 588] if 0 <= code < 11172 else ch)
+    return "".join(out)
+
+
+def _normalize_text(value):
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return ""
+    return " ".join(str(value).lower().split())
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class ItemSearchIndex:
+    def __init__(self, names, codes):
+        self.names = [_normalize_text(v) for v in names]
+        self.codes = [_normalize_text(v).removesuffix(".0") for v in codes]
+        self.initials = [to_choseong(v) for v in self.names]
+        self._postings = {1: {}, 2: {}}
+        for pos, fields in enumerate(zip(self.names, self.codes, self.initials)):
+            for n, postings in self._postings.items():
+                for gram in set().union(*(_grams(f, n) for f in fields)):
+                    postings.setdefault(gram, []).append(pos)
+
+    @classmethod
+    def from_frame(cls, df):
+        if df is None or df.empty:
+            return cls([], [])
+        names = df["품목명"] if "품목명" in df.columns else [""] * len(df)
+        codes = df["품목코드"] if "품목코드" in df.columns else [""] * len(df)
+        return cls(list(names), list(codes))
+
+    @property
+    def nbytes(self):
+        # 공유 캐시 크기 계산용 (정규화한 문자열 + 글자 조각별 위치 목록의 대략 크기)
+        texts = sum(sys.getsizeof(v) for field in (self.names, self.codes, self.initials) for v in field)
+        postings = sum(sys.getsizeof(p) + sys.getsizeof(positions) for postings in self._postings.values() for p, positions in postings.items())
+        return texts + postings + sum(sys.getsizeof(postings) for postings in self._postings.values())
+
+    def search(self, keyword):
+        # 일치하는 행 위치(iloc)를 관련도 순으로 돌려줍니다.
+        query = _normalize_text(keyword)
+        if not query:
+            return list(range(len(self.names)))
+
+        n = 2 if len(query) >= 2 else 1
+        candidates = None
+        for gram in sorted(_grams(query, n), key=lambda g: len(self._postings[n].get(g, ()))):
+            posting = self._postings[n].get(gram)
+            if not posting:
+                return []
+            candidates = set(posting) if candidates is None else candidates.intersection(posting)
+            if not candidates:
+                return []
+
+        initials_only = all(ch in CHOSEONG or ch == " " for ch in query)
+        ranked = []
+        for pos in candidates:
+            rank = self._rank(pos, query, initials_only)
+            if rank is not None:
+                ranked.append((rank, len(self.names[pos]), pos))
+        ranked.sort()
+        return [pos for _, _, pos in ranked]
+
+    def _rank(self, pos, query, initials_only):
+        # 0 완전 일치 > 1 앞부분 일치 > 2 품목명 포함 > 3 품목코드 포함 > 4 초성 앞부분 > 5 초성 포함
+        name, code = self.names[pos], self.codes[pos]
+        if query == name or query == code:
+            return 0
+        if name.startswith(query) or code.startswith(query):
+            return 1
+        if query in name:
+            return 2
+        if query in code:
+            return 3
+        if initials_only:
+            initials = self.initials[pos]
+            if initials.startswith(query):
+                return 4
+            if query in initials:
+                return 5
+        return None
+
+
+# ==========================================
+# 품목 저장소 색인
+# ==========================================
+# 품목코드/품목명 -> 행 위치 dict 로 조회와 중복 검사를 카탈로그 크기와 무관하게 O(1) 로 처리합니다.
+# 행 위치는 공유 캐시에 보관된 인벤토리 프레임(및 그 재고 현황 프레임)의 iloc 위치입니다.
+# 시트 쓰기가 성공하면 storage 가 with_rows() 로 바뀐 행만 반영한 새 객체를 만들어 캐시에 이어 둡니다.
+
+
+class DuplicateItem(WriteConflict):
+    pass
+
+
+class InventoryRepository:
+    def __init__(self, by_code, by_name, size):
+        self.by_code = by_code
+        self.by_name = by_name
+        self.size = size
+
+    @classmethod
+    def from_frame(cls, df):
+        by_code, by_name = {}, {}
+        if df is not None and not df.empty:
+            codes = df["품목코드"] if "품목코드" in df.columns else [""] * len(df)
+            names = df["품목명"] if "품목명" in df.columns else [""] * len(df)
+            for pos, (code, name) in enumerate(zip(codes, names)):
+                by_code.setdefault(cell_key(code), pos)
+                by_name.setdefault(_name_key(name), pos)
+        return cls(by_code, by_name, 0 if df is None else len(df))
+
+    @property
+    def nbytes(self):
+        # 공유 캐시 크기 계산용 (사전 크기만, 키 문자열은 프레임과 대부분 겹칩니다)
+        return sys.getsizeof(self.by_code) + sys.getsizeof(self.by_name)
+
+    def position_by_code(self, code):
+        return self.by_code.get(cell_key(code))
+
+    def position_by_name(self, name):
+        return self.by_name.get(_name_key(name))
+
+    def ensure_new(self, code, name):
+        # 등록 전에 품목코드와 품목명이 모두 비어 있는지 확인합니다 (품목 선택은 품목명 기준이므로 이름도 유일해야 합니다).
+        if cell_key(code) in self.by_code:
+            raise DuplicateItem("동일한 품목코드가 이미 존재합니다.")
+        if _name_key(name) in self.by_name:
+            raise DuplicateItem("동일한 품목명이 이미 존재합니다.")
+
+    def with_rows(self, key_col, results):
+        # storage.modify_rows 결과를 반영한 새 색인. 기존 행은 위치가 그대로이고, 새 행은 결과 순서대로 끝에 붙습니다.
+        # 품목코드 기준 쓰기가 아니면 None 을 돌려주어 다음 조회 때 다시 만들게 합니다.
+        if key_col != "품목코드":
+            return None
+        by_code, by_name, size = dict(self.by_code), dict(self.by_name), self.size
+        for key, row in results.items():
+            pos = by_code.get(key)
+            if pos is None:
+                pos = size
+                size += 1
+                by_code[key] = pos
+            name = _name_key(row.get("품목명"))
+            if by_name.get(name) != pos:
+                # 새 품목이거나 품목명이 바뀐 경우에만 예전 이름 항목을 정리합니다.
+                for old_name in [n for n, p in by_name.items() if p == pos]:
+                    del by_name[old_name]
+                by_name.setdefault(name, pos)
+        return InventoryRepository(by_code, by_name, size)
+
+
+def _name_key(name):
+    return str(to_cell(name)).strip()
@@ -0,0 +1,305 @@
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from storage import cell_key, to_cell
+
+# ==========================================
+# 재고 원장 (수불 로그 = 이벤트 기록)
+# ==========================================
+# logs 시트의 각 행은 품목코드, 부호 있는 변동량(입고 +, 출고 -), 단위를 가진 원장 이벤트입니다.
+# inventory 의 "수량" 은 원장을 반영한 현재 재고 스냅샷이며, 쓰기 큐가 원장 행 추가와 같은 작업 안에서 함께 갱신합니다.
+#
+# StockLedger 는 원장을 시간 순 numpy 배열(일시, 품목 위치, 변동량)로 압축해 둡니다.
+# 시점 재고는 "현재 스냅샷 - 그 시점 이후 변동량 합" 으로, 그 시점 이후 구간의 bincount 한 번으로 계산합니다.
+# (품목 수 × 구간 수 크기의 누적표는 두지 않습니다. 100만 건 bincount 는 수 ms 이지만 누적표는 수백 MB 가 됩니다.)
+# 원장 행이 추가되면 with_appended() 가 새 행만 이어 붙인 객체를 만들어 캐시에 이어 둡니다 (전체 재계산 없음).
+
+LEDGER_COLUMNS = ["일시", "작업구분", "품목코드", "품목명", "변동량", "단위", "내용", "작업자"]
+BASE_UNIT = "개"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 구조화 이전 로그의 "내용" 문구에서 낱개 수량을 찾는 패턴 (앞에서부터 처음 맞는 것을 씁니다)
+#   "입고: 3박스(총 72개) | ..."  "출고: 5개(낱개) | ..."  "마스터 추가 -> ... (초기보유: 10개)"
+_LEGACY_QTY = r"\(총 (\d+)개\)|(\d+)개\(낱개\)|초기보유: (\d+)개"
+
+
+def ledger_row(action, code, name, delta, content, worker="관리자", when=None):
+    return {
+        "일시": (when or datetime.now()).strftime(TIME_FORMAT),
+        "작업구분": action,
+        "품목코드": cell_key(code),
+        "품목명": name,
+        "변동량": int(delta),
+        "단위": BASE_UNIT,
+        "내용": content,
+        "작업자": worker,
+    }
+
+
+def legacy_rows(logs):
+    # 변동량이 비어 있는 (구조화 이전) 행 여부
+    if logs is None or logs.empty:
+        return pd.Series(dtype=bool)
+    if "변동량" not in logs.columns:
+        return pd.Series(True, index=logs.index)
+    return pd.to_numeric(logs["변동량"], errors="coerce").isna()
+
+
+def backfill_ledger(logs, inventory=None):
+    # 구형 로그 행의 "내용" 문구를 한 번에(정규식 열 연산으로) 해석해 변동량/단위/품목코드를 채운 프레임을 돌려줍니다.
+    # 수량을 찾을 수 없는 행은 변동량을 비워 둡니다. 품목코드는 inventory 의 품목명으로 찾습니다.
+    df = logs.copy()
+    for col in LEDGER_COLUMNS:
+        if col not in df.columns:
+            df[col] = ""
+    df = df[LEDGER_COLUMNS + [c for c in df.columns if c not in LEDGER_COLUMNS]]
+
+    legacy = legacy_rows(df)
+    delta = pd.to_numeric(df["변동량"], errors="coerce")
+    if legacy.any():
+        qty = df.loc[legacy, "내용"].astype(str).str.extract(_LEGACY_QTY).bfill(axis=1).iloc[:, 0]
+        sign = np.where(df.loc[legacy, "작업구분"].astype(str).str.startswith("출고"), -1, 1)
+        delta.loc[legacy] = pd.to_numeric(qty, errors="coerce") * sign
+
+    has_delta = delta.notna()
+    df["변동량"] = delta.astype("Int64").astype(object).where(has_delta, "")
+    unit = df["단위"].map(to_cell).astype(str)
+    df["단위"] = unit.where(unit != "", np.where(has_delta, BASE_UNIT, ""))
+
+    codes = df["품목코드"].map(cell_key)
+    if inventory is not None and not inventory.empty:
+        by_name = dict(zip(inventory["품목명"].astype(str).str.strip(), inventory["품목코드"].map(cell_key)))
+        codes = codes.where(codes != "", df["품목명"].astype(str).str.strip().map(by_name).fillna(""))
+    df["품목코드"] = codes
+    return df
+
+
+class StockLedger:
+    def __init__(self, times, items, deltas, keys, names):
+        # times: 시간 순 datetime64[s], items: keys 의 위치, deltas: 부호 있는 낱개 변동량
+        self.times = times
+        self.items = items
+        self.deltas = deltas
+        self.keys = list(keys)
+        self.names = dict(names)
+        self.key_pos = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    def from_frame(cls, logs, inventory=None):
+        if logs is None or logs.empty:
+            return cls.empty()
+        df = backfill_ledger(logs, inventory)
+        times = pd.to_datetime(df["일시"].astype(str), format=TIME_FORMAT, errors="coerce")
+        deltas = pd.to_numeric(df["변동량"], errors="coerce")
+        # 품목코드가 끝내 비어 있는(삭제된 품목 등) 행은 품목명을 키로 씁니다.
+        keys = df["품목코드"].astype(str).where(df["품목코드"] != "", df["품목명"].astype(str).str.strip())
+        valid = times.notna() & deltas.notna() & (keys != "")
+        df, times, deltas, keys = df[valid], times[valid], deltas[valid], keys[valid]
+        if df.empty:
+            return cls.empty()
+
+        order = np.argsort(times.to_numpy(), kind="stable")
+        keys = keys.to_numpy()[order]
+        item_keys, items = np.unique(keys, return_inverse=True)
+        names = dict(zip(keys, df["품목명"].astype(str).to_numpy()[order]))
+        return cls(
+            times.to_numpy().astype("datetime64[s]")[order],
+            items.astype(np.int64),
+            deltas.to_numpy(dtype=np.int64)[order],
+            item_keys,
+            names,
+        )
+
+    @classmethod
+    def empty(cls):
+        return cls(np.array([], dtype="datetime64[s]"), np.array([], dtype=np.int64), np.array([], dtype=np.int64), [], {})
+
+    def __len__(self):
+        return len(self.deltas)
+
+    @property
+    def nbytes(self):
+        # 공유 캐시 크기 계산용 (배열 + 품목 목록/사전의 대략 크기)
+        containers = sys.getsizeof(self.keys) + sys.getsizeof(self.names) + sys.getsizeof(self.key_pos)
+        return self.times.nbytes + self.items.nbytes + self.deltas.nbytes + containers
+
+    def _position(self, when):
+        return int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(when).to_pydatetime(), "s"), side="right"))
+
+    # --- 조회 ---
+    def stock_at(self, when, snapshot):
+        # when 시점(포함)의 품목별 재고. snapshot 은 현재 재고 프레임(품목코드, 품목명, 수량)입니다.
+        # 원장이 처음부터 남아 있지 않아도 되도록 현재 스냅샷에서 그 이후 변동량을 빼서 거꾸로 구합니다.
+        lo = self._position(when)
+        after = np.bincount(self.items[lo:], weights=self.deltas[lo:], minlength=len(self.keys)).astype(np.int64)
+        codes = snapshot["품목코드"].map(cell_key)
+        later = codes.map(lambda k: after[self.key_pos[k]] if k in self.key_pos else 0).astype(np.int64)
+        current = pd.to_numeric(snapshot["수량"], errors="coerce").fillna(0).astype(np.int64)
+        return pd.DataFrame({
+            "품목코드": codes.to_numpy(),
+            "품목명": snapshot["품목명"].to_numpy(),
+            "시점 수량": (current - later).to_numpy(),
+            "현재 수량": current.to_numpy(),
+        })
+
+    def movements(self, start, end):
+        # [start, end] 구간의 품목별 입고/출고/순변동 합계
+        lo, hi = self._position(pd.Timestamp(start) - pd.Timedelta(seconds=1)), self._position(end)
+        items, deltas = self.items[lo:hi], self.deltas[lo:hi]
+        width = len(self.keys)
+        incoming = np.bincount(items, weights=np.where(deltas > 0, deltas, 0), minlength=width).astype(np.int64)
+        outgoing = np.bincount(items, weights=np.where(deltas < 0, -deltas, 0), minlength=width).astype(np.int64)
+        used = (incoming != 0) | (outgoing != 0)
+        keys = [k for k, u in zip(self.keys, used) if u]
+        return pd.DataFrame({
+            "품목코드": keys,
+            "품목명": [self.names.get(k, k) for k in keys],
+            "입고": incoming[used],
+            "출고": outgoing[used],
+            "순변동": (incoming - outgoing)[used],
+        }).sort_values("출고", ascending=False, ignore_index=True)
+
+    def consumption(self, start, end, freq="D"):
+        # [start, end] 구간의 기간(freq: D 일 / W 주 / M 월)별, 품목별 출고량 표 (행: 기간, 열: 품목명)
+        lo, hi = self._position(pd.Timestamp(start) - pd.Timedelta(seconds=1)), self._position(end)
+        deltas = self.deltas[lo:hi]
+        out = deltas < 0
+        if not out.any():
+            return pd.DataFrame()
+        frame = pd.DataFrame({
+            "기간": pd.PeriodIndex(self.times[lo:hi][out], freq=freq).to_timestamp(),
+            "품목명": [self.names.get(self.keys[i], self.keys[i]) for i in self.items[lo:hi][out]],
+            "출고": -deltas[out],
+        })
+        return frame.pivot_table(index="기간", columns="품목명", values="출고", aggfunc="sum", fill_value=0)
+
+    # --- 증분 갱신 ---
+    def with_appended(self, rows):
+        # storage.append_rows 로 추가된 원장 행만 이어 붙인 새 원장. 시간 순서가 어긋나면 None (다음 조회 때 다시 만듦).
+        new = [r for r in rows if pd.notna(pd.to_numeric(to_cell(r.get("변동량")), errors="coerce"))]
+        if not new:
+            return self
+        times = pd.to_datetime([str(r.get("일시")) for r in new], format=TIME_FORMAT, errors="coerce")
+        if times.isna().any():
+            return None
+        times = times.to_numpy().astype("datetime64[s]")
+        if (len(self) and times[0] < self.times[-1]) or (np.diff(times) < np.timedelta64(0, "s")).any():
+            return None
+
+        keys, names = list(self.keys), dict(self.names)
+        key_pos = dict(self.key_pos)
+        items = []
+        for r in new:
+            key = cell_key(r.get("품목코드")) or str(to_cell(r.get("품목명"))).strip()
+            if key not in key_pos:
+                key_pos[key] = len(keys)
+                keys.append(key)
+            names[key] = to_cell(r.get("품목명"))
+            items.append(key_pos[key])
+
+        ledger = StockLedger.__new__(StockLedger)
+        ledger.times = np.concatenate([self.times, times])
+        ledger.items = np.concatenate([self.items, np.array(items, dtype=np.int64)])
+        ledger.deltas = np.concatenate([self.deltas, np.array([int(pd.to_numeric(to_cell(r["변동량"]))) for r in new], dtype=np.int64)])
+        ledger.keys, ledger.names, ledger.key_pos = keys, names, key_pos
+        return ledger
+
+
+# ==========================================
+# 수불 로그 조회 색인
+# ==========================================
+# 로그 화면은 전체 기록을 뒤집어 보내지 않고, 이 색인으로 필터에 맞는 행 위치만 골라 현재 페이지 행만 꺼냅니다.
+# ranks 는 logs 프레임의 iloc 위치를 시간 순으로 정렬한 배열이고, 품목명/작업구분별 색인은 그 순위(rank) 배열입니다.
+# 날짜 구간은 정렬된 시간 배열의 이진 탐색으로, 품목/작업 필터는 미리 나눠 둔 순위 배열의 교집합으로 구합니다.
+
+
+class LogIndex:
+    def __init__(self, ranks, times, by_item, by_action):
+        self.ranks = ranks
+        self.times = times
+        self.by_item = by_item
+        self.by_action = by_action
+
+    @classmethod
+    def from_frame(cls, logs):
+        if logs is None or logs.empty:
+            return cls(np.array([], dtype=np.int64), np.array([], dtype="datetime64[s]"), {}, {})
+        times = pd.to_datetime(logs["일시"].astype(str), format=TIME_FORMAT, errors="coerce").to_numpy().astype("datetime64[s]")
+        # 일시를 읽을 수 없는 행은 가장 오래된 기록으로 취급합니다.
+        times = np.where(np.isnat(times), np.datetime64("1970-01-01T00:00:00", "s"), times)
+        ranks = np.argsort(times, kind="stable")
+        sorted_times = times[ranks]
+        return cls(ranks, sorted_times, _group_ranks(logs, "품목명", ranks), _group_ranks(logs, "작업구분", ranks))
+
+    def __len__(self):
+        return len(self.ranks)
+
+    @property
+    def nbytes(self):
+        # 공유 캐시 크기 계산용 (배열 + 값별 순위 배열)
+        groups = sum(a.nbytes for groups in (self.by_item, self.by_action) for a in groups.values())
+        return self.ranks.nbytes + self.times.nbytes + groups + sys.getsizeof(self.by_item) + sys.getsizeof(self.by_action)
+
+    def items(self):
+        return sorted(self.by_item)
+
+    def actions(self):
+        return sorted(self.by_action)
+
+    def span(self):
+        # (가장 이른 일시, 가장 늦은 일시). 기록이 없으면 None
+        if not len(self):
+            return None
+        return pd.Timestamp(self.times[0]), pd.Timestamp(self.times[-1])
+
+    def query(self, start=None, end=None, item=None, action=None):
+        # 조건에 맞는 행의 iloc 위치를 최신순으로 돌려줍니다. start/end 는 포함 구간입니다.
+        lo = 0 if start is None else int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(start).to_pydatetime(), "s"), side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(end).to_pydatetime(), "s"), side="right"))
+        selected = None
+        for groups, value in ((self.by_item, item), (self.by_action, action)):
+            if value is None:
+                continue
+            group = groups.get(value, np.array([], dtype=np.int64))
+            group = group[np.searchsorted(group, lo):np.searchsorted(group, hi)]
+            selected = group if selected is None else np.intersect1d(selected, group, assume_unique=True)
+        if selected is None:
+            selected = np.arange(lo, hi)
+        return self.ranks[selected[::-1]]
+
+    def with_appended(self, rows):
+        # 새 로그 행은 프레임 끝(iloc = 기존 행 수부터)에 붙습니다. 시간 순서가 어긋나면 None (다음 조회 때 다시 만듦).
+        if not rows:
+            return self
+        times = pd.to_datetime([str(r.get("일시")) for r in rows], format=TIME_FORMAT, errors="coerce")
+        if times.isna().any():
+            return None
+        times = times.to_numpy().astype("datetime64[s]")
+        if (len(self) and times[0] < self.times[-1]) or (np.diff(times) < np.timedelta64(0, "s")).any():
+            return None
+        first_rank, first_pos = len(self), len(self)
+        by_item, by_action = dict(self.by_item), dict(self.by_action)
+        for groups, col in ((by_item, "품목명"), (by_action, "작업구분")):
+            for i, row in enumerate(rows):
+                key = str(to_cell(row.get(col))).strip()
+                groups[key] = np.append(groups.get(key, np.array([], dtype=np.int64)), first_rank + i)
+        return LogIndex(
+            np.concatenate([self.ranks, np.arange(first_pos, first_pos + len(rows))]),
+            np.concatenate([self.times, times]),
+            by_item,
+            by_action,
+        )
+
+
+def _group_ranks(logs, col, ranks):
+    # {값: 시간 순위 배열(오름차순)}
+    if col not in logs.columns:
+        return {}
+    values = logs[col].map(to_cell).astype(str).str.strip().to_numpy()[ranks]
+    codes, uniques = pd.factorize(values)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+    return {value: order[bounds[k]:bounds[k + 1]] for k, value in enumerate(uniques)}
@@ -0,0 +1,126 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# 성능 계측
+# ==========================================
+# 프로세스 전체에서 공유하는 계측기입니다.
+#   span(이름)     구간 소요 시간. 이름별 누적(횟수/합계/최대)과, 진행 중인 화면 실행(trace)의 구간 목록에 함께 남깁니다.
+#   count(이름)    시트 읽기/쓰기 호출 수, 주고받은 바이트, 캐시 적중/실패 같은 누적 카운터 (라벨별로 따로 셉니다)
+# 관리자 사이드바의 성능 패널이 이 값을 보여 주고, JSON(구조화 로그)이나 Prometheus 텍스트로 내보낼 수 있습니다.
+
+_TRACE = contextvars.ContextVar("perf_trace", default=None)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.spans = {}
+        self.started_at = time.time()
+
+    # --- 화면 실행 단위 기록 ---
+    def start_trace(self, name):
+        trace = {"name": name, "started_at": time.time(), "spans": []}
+        _TRACE.set(trace)
+        return trace
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stat = self.spans.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            stat["count"] += 1
+            stat["total"] += seconds
+            stat["max"] = max(stat["max"], seconds)
+        trace = _TRACE.get()
+        if trace is not None:
+            trace["spans"].append((name, seconds))
+
+    def count(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def total(self, name, **labels):
+        # labels 가 모두 일치하는 카운터의 합
+        wanted = set(_label_key(labels))
+        with self._lock:
+            return sum(v for (n, key), v in self.counters.items() if n == name and wanted <= set(key))
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.spans.clear()
+            self.started_at = time.time()
+
+    # --- 내보내기 ---
+    def snapshot(self):
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "counters": [{"name": n, "labels": dict(key), "value": v} for (n, key), v in sorted(self.counters.items())],
+                "spans": {n: dict(stat) for n, stat in sorted(self.spans.items())},
+            }
+
+    def to_json(self, trace=None):
+        data = self.snapshot()
+        if trace is not None:
+            data["trace"] = {"name": trace["name"], "started_at": trace["started_at"], "spans": [{"name": n, "ms": round(s * 1000, 3)} for n, s in trace["spans"]]}
+        return json.dumps(data, ensure_ascii=False)
+
+    def to_prometheus(self, prefix="schedule_app"):
+        lines = []
+        data = self.snapshot()
+        seen = set()
+        for counter in data["counters"]:
+            metric = f"{prefix}_{counter['name']}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            lines.append(f"{metric}{_prom_labels(counter['labels'])} {counter['value']}")
+        if data["spans"]:
+            lines.append(f"# TYPE {prefix}_span_seconds summary")
+            for name, stat in data["spans"].items():
+                labels = _prom_labels({"span": name})
+                lines.append(f"{prefix}_span_seconds_count{labels} {stat['count']}")
+                lines.append(f"{prefix}_span_seconds_sum{labels} {stat['total']:.6f}")
+            lines.append(f"# TYPE {prefix}_span_seconds_max gauge")
+            for name, stat in data["spans"].items():
+                lines.append(f"{prefix}_span_seconds_max{_prom_labels({'span': name})} {stat['max']:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def log_trace(self, trace):
+        # 화면 실행 한 번의 구간 기록을 JSON 한 줄로 남깁니다 (구조화 로그).
+        logger.info(json.dumps({
+            "event": "rerun",
+            "name": trace["name"],
+            "total_ms": round((time.time() - trace["started_at"]) * 1000, 3),
+            "spans": [{"name": n, "ms": round(s * 1000, 3)} for n, s in trace["spans"]],
+        }, ensure_ascii=False))
+
+
+def _prom_labels(labels):
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in sorted(labels.items()))
+    return "{" + body + "}"
+
+
+METRICS = Metrics()
@@ -0,0 +1,234 @@
+import calendar
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# 근무 일정 색인
+# ==========================================
+# Sheet1 의 (date, workers) 행을 날짜 순 배열 하나로 압축합니다.
+# masks[i] 는 start + i 일의 근무자 비트마스크이며, 근무자 k 는 (1 << k) 비트입니다.
+# 월 보기/필터/집계는 날짜 문자열 조회 대신 이 배열의 슬라이스와 비트 연산으로 처리합니다.
+
+
+class ScheduleIndex:
+    def __init__(self, workers, start, masks):
+        self.workers = list(workers)
+        self.start = start
+        self.masks = masks
+        self.bits = {name: np.uint64(1 << k) for k, name in enumerate(self.workers)}
+        self._decoded = {}
+
+    @classmethod
+    def from_frame(cls, df, workers):
+        # workers 순서대로 비트를 배정하고, 시트에만 있는 이름은 뒤에 이어 붙여 데이터가 사라지지 않게 합니다.
+        workers = list(workers)
+        if df is None or df.empty or "date" not in df.columns or "workers" not in df.columns:
+            return cls(workers, date.today(), np.zeros(0, dtype=np.uint64))
+
+        rows = df[["date", "workers"]].dropna()
+        days = pd.to_datetime(rows["date"].astype(str), errors="coerce")
+        pairs = pd.DataFrame({"day": days, "worker": rows["workers"].astype(str).str.split(",")}).explode("worker")
+        pairs["worker"] = pairs["worker"].str.strip()
+        pairs = pairs[pairs["day"].notna() & (pairs["worker"] != "")]
+        if pairs.empty:
+            return cls(workers, date.today(), np.zeros(0, dtype=np.uint64))
+
+        extra = sorted(set(pairs["worker"].unique()) - set(workers))
+        names = workers + extra
+        if len(names) > 64:
+            raise ValueError("근무자는 최대 64명까지 색인할 수 있습니다.")
+
+        start = pairs["day"].min().date()
+        offsets = (pairs["day"] - pd.Timestamp(start)).dt.days.to_numpy()
+        codes = pd.Categorical(pairs["worker"], categories=names).codes.astype(np.uint64)
+        masks = np.zeros(int(offsets.max()) + 1, dtype=np.uint64)
+        np.bitwise_or.at(masks, offsets, np.left_shift(np.uint64(1), codes))
+        return cls(names, start, masks)
+
+    @property
+    def nbytes(self):
+        # 공유 캐시 크기 계산용
+        return self.masks.nbytes
+
+    def span(self, first, last):
+        # first~last(포함) 구간의 마스크 배열. 색인 범위 밖의 날짜는 0(배정 없음)입니다.
+        out = np.zeros((last - first).days + 1, dtype=np.uint64)
+        lo = (first - self.start).days
+        hi = (last - self.start).days + 1
+        src_lo, src_hi = max(lo, 0), min(hi, len(self.masks))
+        if src_lo < src_hi:
+            out[src_lo - lo:src_hi - lo] = self.masks[src_lo:src_hi]
+        return out
+
+    def month(self, year, month):
+        last = calendar.monthrange(year, month)[1]
+        return self.span(date(year, month, 1), date(year, month, last))
+
+    def decode(self, mask):
+        mask = int(mask)
+        names = self._decoded.get(mask)
+        if names is None:
+            names = [name for k, name in enumerate(self.workers) if mask >> k & 1]
+            self._decoded[mask] = names
+        return names
+
+    def matches(self, masks, name):
+        # 필터용: name 이 근무하는 날이면 True. 등록되지 않은 이름은 모두 False 입니다.
+        bit = self.bits.get(name)
+        if bit is None:
+            return np.zeros(len(masks), dtype=bool)
+        return (masks & bit) != 0
+
+    def counts(self, masks):
+        # 근무자별 배정 횟수 {이름: 횟수}
+        return {name: int(((masks & bit) != 0).sum()) for name, bit in self.bits.items()}
+
+
+# ==========================================
+# 달력 테이블
+# ==========================================
+# 여러 해의 날짜별 요일/휴무 여부/공휴일 이름/ISO 문자열/달력 칸 위치를 한 번에 계산해 둔 표입니다.
+# 달력·리스트 화면, 편집 표, 내보내기는 날짜마다 공휴일/요일을 다시 계산하지 않고 이 표의 월 구간을 잘라 씁니다.
+
+WEEKDAY_LABELS = ["월", "화", "수", "목", "금", "토", "일"]
+OFF_WEEKDAYS = (0, 6)  # 월요일, 일요일 정기 휴무
+
+
+class CalendarTable:
+    def __init__(self, frame):
+        self.frame = frame
+        self.start = frame["date"].iloc[0]
+        self.first_year = self.start.year
+        self.last_year = frame["date"].iloc[-1].year
+
+    @classmethod
+    def build(cls, first_year, last_year, holidays):
+        # holidays: 날짜 -> 공휴일 이름 (holidays.KR 등). first_year~last_year 전체를 한 번에 만듭니다.
+        days = pd.date_range(date(first_year, 1, 1), date(last_year, 12, 31), freq="D")
+        weekday = np.asarray(days.weekday)
+        names = {pd.Timestamp(d): name for d, name in holidays.items() if first_year <= d.year <= last_year}
+        holiday = pd.Series(days).map(names).fillna("").to_numpy(dtype=object)
+        grid_col = (weekday + 1) % 7  # 일요일 시작 달력의 칸 (0 = 일)
+        day = np.asarray(days.day)
+        first_col = grid_col - (day - 1) % 7
+        first_col = np.where(first_col < 0, first_col + 7, first_col)  # 그 달 1일의 칸
+        frame = pd.DataFrame({
+            "date": days.date,
+            "iso": days.strftime("%Y-%m-%d"),
+            "year": np.asarray(days.year),
+            "month": np.asarray(days.month),
+            "day": day,
+            "weekday": weekday,
+            "weekday_label": np.array(WEEKDAY_LABELS, dtype=object)[weekday],
+            "holiday": holiday,
+            "is_off": (holiday != "") | np.isin(weekday, OFF_WEEKDAYS),
+            "grid_row": (day - 1 + first_col) // 7,
+            "grid_col": grid_col,
+        })
+        return cls(frame)
+
+    def span(self, first, last):
+        # first~last(포함) 구간의 행 (표 범위 밖이면 ValueError)
+        lo, hi = (first - self.start).days, (last - self.start).days + 1
+        if lo < 0 or hi > len(self.frame):
+            raise ValueError(f"달력 표 범위({self.first_year}~{self.last_year}년) 밖의 날짜입니다.")
+        return self.frame.iloc[lo:hi]
+
+    def month(self, year, month):
+        last = calendar.monthrange(year, month)[1]
+        return self.span(date(year, month, 1), date(year, month, last))
+
+
+# ==========================================
+# 근무 통계
+# ==========================================
+# 색인의 비트마스크 배열을 (날짜 x 근무자) 불리언 표로 한 번 펼쳐 두고,
+# 월/분기/연도별 횟수, 요일 분포, 연속 근무, 연간 공정성 지표를 모두 이 표의 group-by/열 연산으로 계산합니다.
+# 근무 일정이 바뀌면 색인과 함께 다시 만들어집니다.
+
+
+class RosterStats:
+    def __init__(self, schedule_index):
+        self.workers = list(schedule_index.workers)
+        masks = schedule_index.masks
+        self.dates = pd.date_range(schedule_index.start, periods=len(masks), freq="D")
+        shifts = np.arange(len(self.workers), dtype=np.uint64)
+        self.table = pd.DataFrame(
+            ((masks[:, None] >> shifts[None, :]) & np.uint64(1)).astype(bool),
+            index=self.dates,
+            columns=self.workers,
+        )
+
+    @property
+    def nbytes(self):
+        # 공유 캐시 크기 계산용
+        return int(self.table.memory_usage(deep=True).sum())
+
+    def _rows(self, year=None):
+        if year is None:
+            return self.table
+        return self.table[self.dates.year == year]
+
+    def counts(self, freq="M", year=None):
+        # 기간(freq: M 월 / Q 분기 / Y 연도)별 근무자 배정 횟수 (행: 기간, 열: 근무자)
+        # year 를 주면 기록이 없는 기간도 0 으로 채워 그 해의 모든 기간을 보여 줍니다.
+        rows = self._rows(year)
+        out = rows.groupby(rows.index.to_period(freq)).sum()
+        if year is not None:
+            out = out.reindex(pd.period_range(f"{year}-01-01", f"{year}-12-31", freq=freq), fill_value=0)
+        out = out.astype(int)
+        out.index = out.index.astype(str)
+        return out
+
+    def weekday_distribution(self, year=None):
+        # 요일별 배정 횟수 (행: 근무자, 열: 월~일)
+        rows = self._rows(year)
+        out = rows.groupby(rows.index.weekday).sum().reindex(range(7), fill_value=0).astype(int)
+        out.index = WEEKDAY_LABELS
+        return out.T
+
+    def streaks(self, year=None):
+        # 근무자별 최장 연속 근무일수, 그 시작일, 연속 근무(2일 이상) 횟수
+        rows = self._rows(year)
+        records = []
+        for name in self.workers:
+            worked = rows[name].to_numpy()
+            edges = np.diff(np.concatenate([[0], worked.astype(np.int8), [0]]))
+            starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+            lengths = ends - starts
+            longest = int(lengths.max()) if len(lengths) else 0
+            records.append({
+                "근무자": name,
+                "최장 연속": longest,
+                "최장 시작일": rows.index[starts[lengths.argmax()]].strftime("%Y-%m-%d") if longest else "",
+                "연속 근무 횟수": int((lengths >= 2).sum()),
+            })
+        return pd.DataFrame(records, columns=["근무자", "최장 연속", "최장 시작일", "연속 근무 횟수"])
+
+    def fairness(self, year, workers=None):
+        # 연간 공정성: 근무자별 총 배정, 비율, 평균 대비 편차, 주말(토) 배정 (workers 를 주면 그 인원만 비교)
+        rows = self._rows(year)
+        names = [n for n in (workers or self.workers) if n in rows.columns]
+        totals = rows[names].sum().astype(int)
+        saturdays = rows[names][rows.index.weekday == 5].sum().astype(int)
+        mean = totals.mean() if len(totals) else 0
+        out = pd.DataFrame({
+            "근무자": names,
+            "총 배정": totals.to_numpy(),
+            "비율(%)": (totals / max(int(totals.sum()), 1) * 100).round(1).to_numpy(),
+            "평균 대비": (totals - mean).round(1).to_numpy(),
+            "토요일 배정": saturdays.to_numpy(),
+        })
+        return out.sort_values("총 배정", ascending=False, ignore_index=True)
+
+    def report(self, year, workers=None):
+        # 엑셀 내보내기용 [(시트 이름, 표)]
+        return [
+            ("월별", self.counts("M", year).reset_index(names="기간")),
+            ("분기별", self.counts("Q", year).reset_index(names="기간")),
+            ("요일분포", self.weekday_distribution(year).reset_index(names="근무자")),
+            ("연속근무", self.streaks(year)),
+            ("공정성", self.fairness(year, workers)),
+        ]
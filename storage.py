@@ -0,0 +1,972 @@
+import json
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+
+import pandas as pd
+
+from metrics import METRICS
+
+# ==========================================
+# 저장소 계층 (구글 시트 / 로컬 SQLite)
+# ==========================================
+# 화면 코드는 conn.read / conn.update 를 직접 부르지 않고 이 모듈의 SheetStorage 를 통해 시트를 읽고 씁니다.
+# 수불 로그처럼 쌓이기만 하는 시트는 전체를 다시 올리지 않고 새 행만 덧붙입니다.
+#
+# 쓰기는 모두 프로세스 전역 잠금 안에서 "최신 행 읽기 -> 변경분 적용 -> 바뀐 셀만 쓰기" 순서로 처리합니다.
+# 스트림릿 서버는 모든 세션이 한 프로세스를 공유하므로, 세션이 들고 있던 오래된 사본으로
+# 다른 관리자의 변경을 덮어쓰는 일(last-writer-wins)이 생기지 않습니다.
+
+_WRITE_LOCK = threading.RLock()
+
+logger = logging.getLogger(__name__)
+
+# Copy-on-Write 가 켜져 있으면 얕은 복사본을 고쳐도 공유 캐시의 원본은 바뀌지 않습니다 (pandas 3 은 항상 켜짐).
+_PANDAS_MAJOR = int(pd.__version__.split(".")[0])
+if _PANDAS_MAJOR == 2:
+    pd.set_option("mode.copy_on_write", True)
+
+
+class WriteConflict(Exception):
+    # 최신 값에 변경분을 다시 적용할 수 없을 때 (예: 그 사이 재고가 줄어 출고 불가) 발생합니다.
+    pass
+
+
+def to_cell(value):
+    # numpy 정수/실수는 JSON 직렬화가 안 되므로 파이썬 기본형으로, 빈 값은 빈 칸으로 바꿉니다.
+    if value is None:
+        return ""
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and pd.isna(value):
+        return ""
+    return value
+
+
+def to_int(value, default=0):
+    number = pd.to_numeric(to_cell(value), errors="coerce")
+    return default if pd.isna(number) else int(number)
+
+
+def cell_key(value):
+    # 시트에서 숫자로 저장된 품목코드는 pandas 에서 1.0 처럼 읽히므로 문자열로 맞춰 비교합니다.
+    text = str(to_cell(value)).strip()
+    return text[:-2] if text.endswith(".0") else text
+
+
+def a1(row, col):
+    # (1, 1) -> "A1"
+    letters = ""
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return f"{letters}{row}"
+
+
+# ==========================================
+# 행 변경 명세
+# ==========================================
+# 쓰기 큐에 넣거나 저널 파일에 남길 수 있도록, 행 변경을 함수 대신 JSON 으로 저장 가능한 dict 로 표현합니다.
+#   {"op": "set", "values": {...}}                                    값을 그대로 씀
+#   {"op": "add", "col": 열, "amount": 증감, "minimum": 0, "message": ...}  최신 값에 증감 (minimum 아래로 내려가면 WriteConflict)
+#   {"op": "create", "values": {...}, "message": ...}                  키 열 말고는 값이 하나도 없는 새 행일 때만 씀 (이미 있으면 WriteConflict)
+#   {"op": "merge_list", "col": 열, "added": [...], "removed": [...], "base": [...]}
+#       쉼표 목록 열에 추가/제외분만 다시 적용. 최신 값이 base 와 다르면 notes 에 "conflict" 를 남김
+
+def row_updater(spec, notes=None, key_col=None):
+    # key_col 은 create 가 "이미 있는 행" 을 판단할 때 제외할 키 열입니다.
+    op = spec["op"]
+    if op == "set":
+        return lambda row: dict(spec["values"])
+    if op == "add":
+        def add(row):
+            latest = to_int(row.get(spec["col"]))
+            if latest + spec["amount"] < spec.get("minimum", float("-inf")):
+                raise WriteConflict(spec.get("message", "값이 허용 범위를 벗어납니다.").format(latest=latest))
+            return {spec["col"]: latest + spec["amount"]}
+        return add
+    if op == "create":
+        def create(row):
+            if "exists_col" in spec:
+                # 이전 형식(저널에 남은 작업): exists_col 이 채워져 있으면 이미 있는 행
+                exists = to_cell(row.get(spec["exists_col"])) != ""
+            else:
+                exists = any(to_cell(v) != "" for c, v in row.items() if c != key_col)
+            if exists:
+                raise WriteConflict(spec.get("message", "이미 존재하는 행입니다."))
+            return dict(spec["values"])
+        return create
+    if op == "merge_list":
+        def merge(row):
+            latest = [w for w in str(to_cell(row.get(spec["col"]))).split(',') if w]
+            if notes is not None and set(latest) != set(spec["base"]):
+                notes.append("conflict")
+            merged = [w for w in latest if w not in spec["removed"]] + [w for w in spec["added"] if w not in latest]
+            return {spec["col"]: ",".join(merged)}
+        return merge
+    raise ValueError(f"알 수 없는 행 변경 종류입니다: {op}")
+
+
+def chain_updaters(fns):
+    # 같은 행에 대한 여러 updater 를 순서대로 적용한 하나의 updater 로 합칩니다 (쓰기 큐 병합용).
+    def chained(row):
+        row, changes = dict(row), {}
+        for fn in fns:
+            step = dict(fn(dict(row)))
+            row.update(step)
+            changes.update(step)
+        return changes
+    return chained
+
+
+# ==========================================
+# 재시도
+# ==========================================
+
+def is_retryable(exc):
+    # 할당량 초과(429)나 일시적인 서버 오류, 로컬 DB 잠금은 잠시 후 다시 시도하면 성공할 수 있습니다.
+    status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status in (429, 500, 502, 503, 504):
+        return True
+    text = str(exc).lower()
+    return any(word in text for word in ("quota", "rate limit", "resource_exhausted", "429", "database is locked"))
+
+
+def retry_with_backoff(fn, attempts=6, base_delay=1.0, max_delay=60.0, sleep=time.sleep):
+    # 재시도할 만한 오류면 1, 2, 4, 8... 초(최대 max_delay, 약간의 무작위 지연 포함) 기다렸다가 다시 호출합니다.
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_retryable(e):
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            logger.warning("쓰기 재시도 %d/%d (%.1f초 후): %s", attempt + 1, attempts - 1, delay, e)
+            METRICS.count("write_retries")
+            sleep(delay * random.uniform(0.5, 1.0))
+
+
+def _next_row(key_col, key, current, fn, version_col, base_versions):
+    # 최신 행에 updater 를 적용해 (반영 후 행, 바뀐 셀, stale 여부)를 돌려줍니다.
+    row = dict(current)
+    row[key_col] = key
+    changes = dict(fn(dict(row)))
+    is_stale = False
+    if version_col:
+        version = to_int(row.get(version_col))
+        is_stale = key in base_versions and to_int(base_versions[key]) != version
+        changes[version_col] = version + 1
+    row.update(changes)
+    return row, changes, is_stale
+
+
+def _text_key(value):
+    return str(to_cell(value)).strip()
+
+
+def _check_unique(unique_cols, changed, lookup):
+    # changed 는 {키: 바꿀 {컬럼: 값}}, lookup(열, 값 목록) 은 최신 시트에서 그 값을 가진 (키, 값) 들입니다.
+    # 바뀐 unique 열 값이 다른 키의 행이나 같은 요청의 다른 행과 겹치면 아무것도 쓰기 전에 WriteConflict 를 냅니다.
+    for col in unique_cols:
+        wanted = {}
+        for key, changes in changed.items():
+            value = _text_key(changes.get(col))
+            if col not in changes or not value:
+                continue
+            if wanted.setdefault(value, key) != key:
+                raise WriteConflict(f"동일한 {col} 값이 이미 존재합니다: {value}")
+        if not wanted:
+            continue
+        for key, value in lookup(col, list(wanted)):
+            value = _text_key(value)
+            if value in wanted and cell_key(key) != wanted[value]:
+                raise WriteConflict(f"동일한 {col} 값이 이미 존재합니다: {value}")
+
+
+def _apply_rows(frame, key_col, results):
+    # modify_rows 결과를 캐시된 프레임에도 반영합니다 (API 호출 없음).
+    frame = frame.copy()
+    if key_col not in frame.columns:
+        frame[key_col] = pd.Series(dtype=object)
+    keys = frame[key_col].map(cell_key)
+    new_rows = []
+    for key, row in results.items():
+        matches = frame.index[keys == key]
+        if len(matches) == 0:
+            new_rows.append(row)
+            continue
+        for col, value in row.items():
+            if col == key_col:
+                continue
+            if col in frame.columns and frame[col].dtype != object and not isinstance(value, (int, float)):
+                frame[col] = frame[col].astype(object)
+            frame.loc[matches[0], col] = value
+    if new_rows:
+        frame = pd.concat([frame, pd.DataFrame(new_rows)], ignore_index=True)
+    return frame
+
+
+# ==========================================
+# 프로세스 공유 캐시
+# ==========================================
+# 접속한 세션 수와 무관하게 워크시트당 DataFrame 한 벌만 메모리에 두고 모든 세션이 나눠 씁니다.
+# 세션에는 얕은 복사본(읽기 전용 뷰)을 돌려주므로 세션 쪽에서 열을 고쳐도 원본은 그대로입니다.
+# 검색 색인처럼 프레임에서 파생되는 객체도 함께 보관했다가, 해당 워크시트가 바뀌면 같이 버립니다.
+# 크기 한도(max_bytes)는 프레임과 파생 객체를 합친 크기로 계산합니다. 파생 객체는 nbytes(대략의 바이트 수)를 제공합니다.
+
+class _CacheEntry:
+    def __init__(self, frame):
+        self.frame = frame
+        self.loaded_at = time.monotonic()
+        self.nbytes = _nbytes(frame)
+        self.derived = {}
+
+    def add(self, name, value):
+        self.derived[name] = value
+        self.nbytes += _nbytes(value)
+
+
+def _nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    return int(getattr(value, "nbytes", 0))
+
+
+class SheetCache:
+    def __init__(self, ttl_seconds=180, max_entries=16, max_bytes=512 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks = {}
+
+    def get(self, worksheet, loader):
+        entry = self._fresh_entry(worksheet)
+        if entry is None:
+            # 같은 워크시트를 여러 세션이 동시에 놓쳐도 시트는 한 번만 읽습니다.
+            with self._load_lock(worksheet):
+                entry = self._fresh_entry(worksheet)
+                if entry is None:
+                    METRICS.count("cache_requests", worksheet=worksheet, result="miss")
+                    entry = self._store(worksheet, _CacheEntry(loader()))
+                    return _view(entry.frame)
+        METRICS.count("cache_requests", worksheet=worksheet, result="hit")
+        return _view(entry.frame)
+
+    def derived(self, worksheet, name, loader, builder):
+        # 캐시된 프레임에서 파생 객체를 만들어 두고 재사용합니다. 만들어진 객체는 모든 세션이 공유하므로 고치면 안 됩니다.
+        frame = self.get(worksheet, loader)
+        with self._lock:
+            entry = self._entries.get(worksheet)
+            if entry is not None:
+                if name in entry.derived:
+                    METRICS.count("derived_requests", worksheet=worksheet, derived=name, result="hit")
+                    return entry.derived[name]
+                frame = entry.frame
+        METRICS.count("derived_requests", worksheet=worksheet, derived=name, result="miss")
+        with METRICS.span(f"derive.{worksheet}.{name}"):
+            value = builder(frame)
+        with self._lock:
+            if entry is not None and self._entries.get(worksheet) is entry:
+                entry.add(name, value)
+                self._evict()
+        return value
+
+    def update(self, worksheet, fn, key_col=None, results=None, appended=None):
+        # 쓰기가 성공한 뒤 캐시된 프레임에 같은 변경을 반영합니다.
+        # 파생 객체는 버리고 다음 조회 때 다시 만들되, with_rows(key_col, results) 를 가진 객체는
+        # 바뀐 행만 반영한 새 객체로 이어서 씁니다 (예: 품목 색인).
+        # 행 추가(appended)일 때는 with_appended(rows) 를 가진 객체를 같은 방식으로 이어서 씁니다 (예: 재고 원장).
+        with self._lock:
+            entry = self._entries.get(worksheet)
+            if entry is None:
+                return
+            try:
+                new_entry = _CacheEntry(fn(entry.frame))
+                for name, value in entry.derived.items():
+                    updated = None
+                    if results is not None and hasattr(value, "with_rows"):
+                        updated = value.with_rows(key_col, results)
+                    elif appended is not None and hasattr(value, "with_appended"):
+                        updated = value.with_appended(appended)
+                    if updated is not None:
+                        new_entry.add(name, updated)
+            except Exception:
+                self._entries.pop(worksheet, None)
+                return
+            self._store(worksheet, new_entry, loaded_at=entry.loaded_at)
+
+    def invalidate(self, worksheet=None):
+        with self._lock:
+            if worksheet is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(worksheet, None)
+
+    def entries(self):
+        # 성능 패널용: 보관 중인 워크시트별 (나이 초, 크기 바이트, 파생 객체 이름)
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {"worksheet": name, "age": now - e.loaded_at, "nbytes": e.nbytes, "derived": sorted(e.derived)}
+                for name, e in self._entries.items()
+            ]
+
+    def _fresh_entry(self, worksheet):
+        with self._lock:
+            entry = self._entries.get(worksheet)
+            if entry is None:
+                return None
+            if time.monotonic() - entry.loaded_at > self.ttl_seconds:
+                self._entries.pop(worksheet, None)
+                METRICS.count("cache_expired", worksheet=worksheet)
+                return None
+            self._entries.move_to_end(worksheet)
+            return entry
+
+    def _store(self, worksheet, entry, loaded_at=None):
+        with self._lock:
+            if loaded_at is not None:
+                entry.loaded_at = loaded_at
+            self._entries[worksheet] = entry
+            self._entries.move_to_end(worksheet)
+            self._evict()
+            return entry
+
+    def _evict(self):
+        # 가장 오래 쓰이지 않은 워크시트부터 내보냅니다. 가장 최근에 쓴 항목은 남깁니다.
+        with self._lock:
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries
+                or sum(e.nbytes for e in self._entries.values()) > self.max_bytes
+            ):
+                evicted, _ = self._entries.popitem(last=False)
+                METRICS.count("cache_evicted", worksheet=evicted)
+
+    def _load_lock(self, worksheet):
+        with self._lock:
+            return self._load_locks.setdefault(worksheet, threading.Lock())
+
+
+def _view(frame):
+    if _PANDAS_MAJOR >= 2:
+        return frame.copy(deep=False)
+    return frame.copy()
+
+
+SHEET_CACHE = SheetCache()
+
+
+# ==========================================
+# 저장소 창구
+# ==========================================
+# 화면 코드는 이 객체만 사용합니다. 읽기는 공유 캐시를 거치고, 실제 읽기/쓰기는 엔진(backend)이 맡습니다.
+# 엔진은 read / overwrite / append_values / modify_rows 네 가지만 제공하면 됩니다.
+#   GSheetsBackend  구글 시트 (기존 방식)
+#   SQLiteBackend   로컬 SQLite 파일 (색인 조회, 트랜잭션 재고 갱신, 구글 계정 없이 실행 가능)
+#   MirroredBackend 로컬 엔진을 주 저장소로 쓰고 구글 시트에는 백그라운드로 뒤따라 쓰기
+
+class SheetStorage:
+    def __init__(self, backend, cache=SHEET_CACHE):
+        self.backend = backend
+        self.cache = cache
+
+    def read(self, worksheet):
+        return self.cache.get(worksheet, lambda: self._load(worksheet))
+
+    def derived(self, worksheet, name, builder):
+        return self.cache.derived(worksheet, name, lambda: self._load(worksheet), builder)
+
+    def _load(self, worksheet):
+        # 캐시를 놓쳤을 때만 불립니다. 엔진 읽기 시간과 읽은 양(행/바이트)을 남깁니다.
+        with METRICS.span(f"storage.read.{worksheet}"):
+            df = self.backend.read(worksheet)
+        backend = type(self.backend).__name__
+        METRICS.count("storage_reads", worksheet=worksheet, backend=backend)
+        METRICS.count("storage_rows", len(df), worksheet=worksheet, direction="read")
+        METRICS.count("storage_bytes", int(df.memory_usage(deep=True).sum()), worksheet=worksheet, direction="read")
+        return df
+
+    def _written(self, worksheet, op, data):
+        # data 는 보낸 프레임이나 셀 값 행 리스트입니다. 바이트는 프레임이면 읽을 때와 같은 메모리 크기로,
+        # (추가/수정처럼 작은) 행 리스트면 셀 값을 문자열로 바꾼 길이의 합으로 어림합니다.
+        if isinstance(data, pd.DataFrame):
+            nbytes = int(data.memory_usage(deep=True).sum())
+        else:
+            nbytes = sum(len(str(v).encode()) for row in data for v in row)
+        METRICS.count("storage_writes", worksheet=worksheet, backend=type(self.backend).__name__, op=op)
+        METRICS.count("storage_rows", len(data), worksheet=worksheet, direction="write")
+        METRICS.count("storage_bytes", nbytes, worksheet=worksheet, direction="write")
+
+    def invalidate(self, worksheet=None):
+        self.cache.invalidate(worksheet)
+
+    def overwrite(self, worksheet, df):
+        with _WRITE_LOCK, METRICS.span(f"storage.overwrite.{worksheet}"):
+            self.backend.overwrite(worksheet, df)
+            self._written(worksheet, "overwrite", df)
+            self.cache.update(worksheet, lambda frame: df.copy())
+
+    def append_rows(self, worksheet, rows, columns):
+        # rows 는 dict 리스트, columns 는 시트 헤더 순서입니다. 헤더에 없는 키는 버려집니다.
+        values = [[to_cell(row.get(c, "")) for c in columns] for row in rows]
+        with _WRITE_LOCK, METRICS.span(f"storage.append.{worksheet}"):
+            self.backend.append_values(worksheet, values, columns)
+            self._written(worksheet, "append", values)
+            self.cache.update(
+                worksheet,
+                lambda frame: pd.concat([frame, pd.DataFrame(values, columns=columns)], ignore_index=True),
+                appended=[dict(zip(columns, row)) for row in values],
+            )
+
+    def rewrite(self, worksheet, fn):
+        # 잠금 안에서 최신 워크시트 전체를 읽어 fn(df) 결과로 통째로 다시 씁니다 (구형 로그 변환 같은 일회성 정리용).
+        with _WRITE_LOCK, METRICS.span(f"storage.rewrite.{worksheet}"):
+            df = fn(self.backend.read(worksheet))
+            self.backend.overwrite(worksheet, df)
+            self._written(worksheet, "overwrite", df)
+            self.cache.update(worksheet, lambda frame: df.copy())
+            return df
+
+    def modify_rows(self, worksheet, key_col, updaters, version_col=None, base_versions=None, insert_missing=False, unique_cols=()):
+        # updaters 는 {키값: fn(현재 행 dict) -> 바꿀 {컬럼: 값}} 입니다.
+        # fn 은 잠금 안에서 시트의 최신 행을 받아 호출되므로, 증감 같은 변경분을 최신 값 위에 다시 적용할 수 있습니다.
+        # version_col 이 있으면 행 버전을 1씩 올리고, base_versions(세션이 보고 있던 버전)와 다른 키를 stale 로 돌려줍니다.
+        # unique_cols 의 열(예: 품목명)은 바뀐 값이 최신 시트의 다른 행과 겹치면 WriteConflict 로 거절됩니다.
+        # 반환값: ({키값: 반영 후 행 dict}, stale 키 목록)
+        if not updaters:
+            return {}, []
+        base_versions = {cell_key(k): v for k, v in (base_versions or {}).items()}
+        with _WRITE_LOCK, METRICS.span(f"storage.modify.{worksheet}"):
+            results, stale = self.backend.modify_rows(worksheet, key_col, updaters, version_col, base_versions, insert_missing, unique_cols)
+            self._written(worksheet, "modify", [list(row.values()) for row in results.values()])
+            self.cache.update(worksheet, lambda frame: _apply_rows(frame, key_col, results), key_col, results)
+            return results, stale
+
+
+class GSheetsBackend:
+    def __init__(self, conn):
+        self.conn = conn
+        self._headers = {}
+        self._worksheets = {}
+
+    def read(self, worksheet):
+        # 스트림릿의 세션별 사본 캐시(ttl)는 끄고, 만료 관리는 공유 캐시가 맡습니다.
+        self._api("read", worksheet)
+        return self.conn.read(worksheet=worksheet, ttl=0)
+
+    def overwrite(self, worksheet, df):
+        self._headers.pop(worksheet, None)
+        self._worksheets.pop(worksheet, None)
+        self._api("update", worksheet)
+        self.conn.update(worksheet=worksheet, data=df)
+
+    def append_values(self, worksheet, values, columns):
+        ws = self._worksheet(worksheet)
+        if ws is not None:
+            # 시트 행 수와 무관하게 새 행만 전송됩니다 (API 1회, 헤더는 워크시트당 처음 한 번만 읽음).
+            header = self._header(ws, worksheet, columns)
+            positions = [columns.index(c) if c in columns else None for c in header]
+            values = [[row[i] if i is not None else "" for i in positions] for row in values]
+            self._api("append_rows", worksheet)
+            try:
+                ws.append_rows(values, value_input_option="USER_ENTERED", table_range="A1")
+            except Exception:
+                self._forget(worksheet)
+                raise
+            return
+        # gspread 워크시트에 접근할 수 없는 연결은 기존 방식대로 읽은 뒤 전체를 다시 씁니다.
+        self._api("read", worksheet)
+        df = self.conn.read(worksheet=worksheet, ttl=0)
+        df = pd.concat([df, pd.DataFrame(values, columns=columns)], ignore_index=True)
+        self._api("update", worksheet)
+        self.conn.update(worksheet=worksheet, data=df)
+
+    def modify_rows(self, worksheet, key_col, updaters, version_col, base_versions, insert_missing, unique_cols=()):
+        ws = self._worksheet(worksheet)
+        if ws is None:
+            return self._modify_frame(worksheet, key_col, updaters, version_col, base_versions, insert_missing, unique_cols)
+        try:
+            return self._modify_sheet(ws, worksheet, key_col, updaters, version_col, base_versions, insert_missing, unique_cols)
+        except (WriteConflict, KeyError):
+            raise
+        except Exception:
+            self._forget(worksheet)
+            raise
+
+    def _modify_sheet(self, ws, worksheet, key_col, updaters, version_col, base_versions, insert_missing, unique_cols):
+        self._headers.pop(worksheet, None)
+        self._api("row_values", worksheet)
+        header = ws.row_values(1)
+        if key_col not in header:
+            raise KeyError(f"'{worksheet}' 시트에 '{key_col}' 열이 없습니다.")
+        key_rows = {}
+        self._api("col_values", worksheet)
+        key_cells = ws.col_values(header.index(key_col) + 1)[1:]
+        for row_no, value in enumerate(key_cells, start=2):
+            key_rows.setdefault(cell_key(value), row_no)
+
+        found = [cell_key(k) for k in updaters if cell_key(k) in key_rows]
+        current = {}
+        if found:
+            ranges = [f"{key_rows[k]}:{key_rows[k]}" for k in found]
+            self._api("batch_get", worksheet)
+            for key, values in zip(found, ws.batch_get(ranges, value_render_option="UNFORMATTED_VALUE")):
+                cells = values[0] if values else []
+                current[key] = {c: (cells[i] if i < len(cells) else "") for i, c in enumerate(header)}
+
+        # 모든 변경분을 먼저 계산합니다. 하나라도 실패하면 아무것도 쓰지 않습니다.
+        results, stale, cells, new_rows, changed = {}, [], [], [], {}
+        for key, fn in updaters.items():
+            key = cell_key(key)
+            if key not in current and not insert_missing:
+                raise KeyError(f"'{worksheet}' 시트에서 {key_col}={key} 행을 찾을 수 없습니다.")
+            row, changes, is_stale = _next_row(key_col, key, current.get(key, {}), fn, version_col, base_versions)
+            results[key] = row
+            changed[key] = changes
+            if is_stale:
+                stale.append(key)
+            if key in current:
+                cells.extend((key_rows[key], col, value) for col, value in changes.items())
+            else:
+                new_rows.append(row)
+        _check_unique(unique_cols, changed, lambda col, values: self._column_cells(ws, worksheet, header, col, key_cells))
+
+        columns = list(header)
+        for col in [col for _, col, _ in cells] + [col for row in new_rows for col in row]:
+            if col not in columns:
+                columns.append(col)
+        if len(columns) > len(header):
+            # 버전 열처럼 시트에 없던 열은 헤더 끝에 추가합니다.
+            if ws.col_count < len(columns):
+                self._api("add_cols", worksheet)
+                ws.add_cols(len(columns) - ws.col_count)
+            cells.extend((1, col, col) for col in columns[len(header):])
+
+        if cells:
+            self._api("batch_update", worksheet)
+            ws.batch_update(
+                [{"range": a1(row_no, columns.index(col) + 1), "values": [[to_cell(value)]]} for row_no, col, value in cells],
+                value_input_option="USER_ENTERED",
+            )
+        if new_rows:
+            self._api("append_rows", worksheet)
+            ws.append_rows(
+                [[to_cell(row.get(c, "")) for c in columns] for row in new_rows],
+                value_input_option="USER_ENTERED",
+                table_range="A1",
+            )
+        return results, stale
+
+    def _column_cells(self, ws, worksheet, header, col, key_cells):
+        # (키, 열 값) 쌍. 시트에 없는 열이면 비어 있습니다.
+        if col not in header:
+            return []
+        self._api("col_values", worksheet)
+        return zip(key_cells, ws.col_values(header.index(col) + 1)[1:])
+
+    def _header(self, ws, worksheet, columns):
+        # 시트 헤더에 없는 열(예: 원장 구조화로 늘어난 로그 열)은 헤더 끝에 추가한 뒤 그 순서로 값을 맞춥니다.
+        header = self._headers.get(worksheet)
+        if header is None:
+            self._api("row_values", worksheet)
+            header = ws.row_values(1) or []
+        missing = [c for c in columns if c not in header]
+        if missing:
+            header = header + missing
+            if ws.col_count < len(header):
+                self._api("add_cols", worksheet)
+                ws.add_cols(len(header) - ws.col_count)
+            self._api("batch_update", worksheet)
+            ws.batch_update(
+                [{"range": a1(1, len(header) - len(missing) + i + 1), "values": [[c]]} for i, c in enumerate(missing)],
+                value_input_option="USER_ENTERED",
+            )
+        self._headers[worksheet] = header
+        return header
+
+    def _modify_frame(self, worksheet, key_col, updaters, version_col, base_versions, insert_missing, unique_cols=()):
+        # gspread 워크시트가 없는 연결용: 최신 시트 전체를 읽어 같은 규칙으로 적용한 뒤 통째로 씁니다.
+        self._api("read", worksheet)
+        df = self.conn.read(worksheet=worksheet, ttl=0)
+        if key_col not in df.columns:
+            df[key_col] = pd.Series(dtype=object)
+        df = df.astype({c: object for c in df.columns})
+        keys = df[key_col].map(cell_key)
+        results, stale, changed = {}, [], {}
+        for key, fn in updaters.items():
+            key = cell_key(key)
+            matches = df.index[keys == key]
+            if len(matches) == 0 and not insert_missing:
+                raise KeyError(f"'{worksheet}' 시트에서 {key_col}={key} 행을 찾을 수 없습니다.")
+            current = df.loc[matches[0]].to_dict() if len(matches) else {}
+            row, changes, is_stale = _next_row(key_col, key, current, fn, version_col, base_versions)
+            results[key] = row
+            changed[key] = changes
+            if is_stale:
+                stale.append(key)
+            if len(matches):
+                for col, value in changes.items():
+                    df.loc[matches[0], col] = value
+            else:
+                df = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+                keys = df[key_col].map(cell_key)
+        _check_unique(unique_cols, changed, lambda col, values: zip(df[key_col], df[col]) if col in df.columns else [])
+        self._api("update", worksheet)
+        self.conn.update(worksheet=worksheet, data=df)
+        return results, stale
+
+    def _api(self, op, worksheet):
+        # 구글 시트 API 요청 수 (분당 할당량은 요청 수 기준입니다)
+        METRICS.count("sheets_api_calls", op=op, worksheet=worksheet)
+
+    def _worksheet(self, worksheet):
+        # 서비스 계정 연결일 때만 내부 gspread 워크시트를 꺼낼 수 있습니다.
+        # _select_worksheet 는 부를 때마다 스프레드시트(open_by_url)와 워크시트 목록을 읽으므로(API 2회) 핸들을 이름별로 보관합니다.
+        # 없는 워크시트(WorksheetNotFound)는 보관하지 않고, 보관한 핸들로 쓰다가 시트 오류가 나면 버리고 다음에 다시 찾습니다.
+        ws = self._worksheets.get(worksheet)
+        if ws is not None:
+            return ws
+        client = getattr(self.conn, "client", None)
+        select = getattr(client, "_select_worksheet", None)
+        if select is None:
+            return None
+        self._api("open_by_url", worksheet)
+        self._api("worksheet", worksheet)
+        ws = select(worksheet=worksheet)
+        self._worksheets[worksheet] = ws
+        return ws
+
+    def _forget(self, worksheet):
+        self._worksheets.pop(worksheet, None)
+        self._headers.pop(worksheet, None)
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+_KEY_PREFIX = "__key__"
+
+
+class SQLiteBackend:
+    # 로컬 SQLite 파일 하나에 워크시트마다 테이블 하나를 둡니다.
+    # 열은 타입 없이 선언해 시트처럼 값을 받은 그대로 보관하고, 행 순서는 rowid(입력 순서)로 유지합니다.
+    # schemas 는 {워크시트: 기본 열 목록}, indexes 는 {워크시트: 색인을 걸 열 목록} 입니다.
+    # 셀 값은 받은 그대로 저장하고, 색인 열마다 cell_key 로 맞춘 값을 숨은 열("__key__열이름")에 함께 적어 그 열에 일반 색인을 겁니다.
+    # ("1.0" 과 "1" 같은 키를 같은 값으로 찾습니다.) 스키마에는 앱 전용 함수가 없으므로 다른 SQLite 도구로도 읽고 쓸 수 있습니다.
+    # 다른 도구가 넣거나 키 열을 고친 행은 숨은 열이 비게 되며(트리거), 이 앱이 다음에 쓸 때 채워집니다.
+    def __init__(self, path, schemas=None, indexes=None):
+        self.path = path
+        self.schemas = schemas or {}
+        self.indexes = indexes or {}
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self._connect()) as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            # 예전 버전이 만든 cell_key(열) 식 색인은 다른 도구의 쓰기를 막으므로 지웁니다.
+            for worksheet, cols in self.indexes.items():
+                for col in cols:
+                    db.execute(f"DROP INDEX IF EXISTS {_quote(f'ix_{worksheet}_{col}_key')}")
+
+    def _connect(self):
+        # 스트림릿 세션은 각자 다른 스레드에서 돌기 때문에 연결은 호출마다 새로 엽니다 (로컬 파일이라 비용이 작습니다).
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        # 숨은 키 열을 채울 때 씁니다 (스키마에는 쓰이지 않습니다).
+        db.create_function("cell_key", 1, cell_key, deterministic=True)
+        return db
+
+    def has_table(self, worksheet):
+        with closing(self._connect()) as db:
+            return bool(self._columns(db, worksheet))
+
+    def read(self, worksheet):
+        with closing(self._connect()) as db:
+            if not self._columns(db, worksheet):
+                return pd.DataFrame(columns=self.schemas.get(worksheet, []))
+            columns = ", ".join(_quote(c) for c in self._columns(db, worksheet))
+            return pd.read_sql_query(f"SELECT {columns} FROM {_quote(worksheet)} ORDER BY rowid", db)
+
+    def overwrite(self, worksheet, df):
+        columns = list(df.columns)
+        rows = [[to_cell(v) for v in row] for row in df.itertuples(index=False, name=None)]
+        with closing(self._connect()) as db, self._transaction(db):
+            db.execute(f"DROP TABLE IF EXISTS {_quote(worksheet)}")
+            self._ensure_table(db, worksheet, columns)
+            self._insert(db, worksheet, columns, rows)
+
+    def append_values(self, worksheet, values, columns):
+        with closing(self._connect()) as db, self._transaction(db):
+            self._ensure_table(db, worksheet, columns)
+            self._insert(db, worksheet, columns, values)
+
+    def modify_rows(self, worksheet, key_col, updaters, version_col, base_versions, insert_missing, unique_cols=()):
+        # 한 트랜잭션 안에서 색인된 키로 대상 행만 읽고 고칩니다. 중간에 실패하면 전부 취소됩니다.
+        with closing(self._connect()) as db, self._transaction(db):
+            self._ensure_table(db, worksheet, [key_col], index_cols=[key_col])
+            keys = [cell_key(k) for k in updaters]
+            current = {}
+            for chunk_start in range(0, len(keys), 500):
+                chunk = keys[chunk_start:chunk_start + 500]
+                cursor = db.execute(
+                    f"SELECT rowid, {', '.join(_quote(c) for c in self._columns(db, worksheet))} FROM {_quote(worksheet)} "
+                    f"WHERE {_quote(_KEY_PREFIX + key_col)} IN ({','.join('?' * len(chunk))}) ORDER BY rowid",
+                    chunk,
+                )
+                names = [d[0] for d in cursor.description]
+                for values in cursor.fetchall():
+                    row = dict(zip(names[1:], values[1:]))
+                    current.setdefault(cell_key(row[key_col]), (values[0], row))
+
+            results, stale, updates, new_rows, changed = {}, [], [], [], {}
+            for key, fn in updaters.items():
+                key = cell_key(key)
+                if key not in current and not insert_missing:
+                    raise KeyError(f"'{worksheet}' 시트에서 {key_col}={key} 행을 찾을 수 없습니다.")
+                rowid, row_now = current.get(key, (None, {}))
+                row, changes, is_stale = _next_row(key_col, key, row_now, fn, version_col, base_versions)
+                results[key] = row
+                changed[key] = changes
+                if is_stale:
+                    stale.append(key)
+                if rowid is None:
+                    new_rows.append(row)
+                else:
+                    updates.append((rowid, changes))
+
+            _check_unique(unique_cols, changed, lambda col, values: self._lookup(db, worksheet, key_col, col, values))
+            self._ensure_table(db, worksheet, [c for _, changes in updates for c in changes] + [c for row in new_rows for c in row])
+            keyed = self._keyed(db, worksheet)
+            for rowid, changes in updates:
+                cols = list(changes)
+                values = [to_cell(changes[c]) for c in cols]
+                for col in keyed:
+                    if col in changes:
+                        cols.append(_KEY_PREFIX + col)
+                        values.append(cell_key(changes[col]))
+                db.execute(
+                    f"UPDATE {_quote(worksheet)} SET {', '.join(f'{_quote(c)} = ?' for c in cols)} WHERE rowid = ?",
+                    values + [rowid],
+                )
+            if new_rows:
+                columns = self._columns(db, worksheet)
+                self._insert(db, worksheet, columns, [[to_cell(row.get(c, "")) for c in columns] for row in new_rows])
+            return results, stale
+
+    def _lookup(self, db, worksheet, key_col, col, values):
+        # col 값이 values 중 하나인 행의 (키, 값). 숨은 키 열이 있는 열이면 그 색인을 탑니다.
+        if col not in self._columns(db, worksheet):
+            return []
+        keys = [cell_key(v) for v in values]
+        target = _quote(_KEY_PREFIX + col) if col in self._keyed(db, worksheet) else f"cell_key({_quote(col)})"
+        return db.execute(
+            f"SELECT {_quote(key_col)}, {_quote(col)} FROM {_quote(worksheet)} WHERE {target} IN ({','.join('?' * len(keys))})",
+            keys,
+        ).fetchall()
+
+    @contextmanager
+    def _transaction(self, db):
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _columns(self, db, worksheet):
+        # 시트 열 (숨은 키 열 제외)
+        return [c for c in self._all_columns(db, worksheet) if not c.startswith(_KEY_PREFIX)]
+
+    def _keyed(self, db, worksheet):
+        # 숨은 키 열이 있는 시트 열
+        return [c[len(_KEY_PREFIX):] for c in self._all_columns(db, worksheet) if c.startswith(_KEY_PREFIX)]
+
+    def _all_columns(self, db, worksheet):
+        return [row[1] for row in db.execute(f"PRAGMA table_info({_quote(worksheet)})")]
+
+    def _ensure_table(self, db, worksheet, columns, index_cols=()):
+        existing = self._all_columns(db, worksheet)
+        wanted = []
+        for col in list(self.schemas.get(worksheet, [])) + list(columns):
+            if col not in wanted:
+                wanted.append(col)
+        if not existing:
+            db.execute(f"CREATE TABLE {_quote(worksheet)} ({', '.join(_quote(c) for c in wanted)})")
+        else:
+            for col in wanted:
+                if col not in existing:
+                    db.execute(f"ALTER TABLE {_quote(worksheet)} ADD COLUMN {_quote(col)}")
+        for col in list(self.indexes.get(worksheet, [])) + list(index_cols):
+            self._ensure_key(db, worksheet, col)
+
+    def _ensure_key(self, db, worksheet, col):
+        # col 의 숨은 키 열과 색인, 다른 도구가 col 을 고치면 키를 비우는 트리거를 두고, 빈 키를 채웁니다.
+        table, key = _quote(worksheet), _quote(_KEY_PREFIX + col)
+        if _KEY_PREFIX + col not in self._all_columns(db, worksheet):
+            db.execute(f"ALTER TABLE {table} ADD COLUMN {key}")
+        db.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'ix_{worksheet}_{_KEY_PREFIX}{col}')} ON {table} ({key})")
+        db.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {_quote(f'tr_{worksheet}_{_KEY_PREFIX}{col}')} AFTER UPDATE OF {_quote(col)} ON {table} "
+            f"WHEN NEW.{key} IS OLD.{key} BEGIN UPDATE {table} SET {key} = NULL WHERE rowid = NEW.rowid; END"
+        )
+        db.execute(f"UPDATE {table} SET {key} = cell_key({_quote(col)}) WHERE {key} IS NULL")
+
+    def _insert(self, db, worksheet, columns, rows):
+        keyed = [c for c in self._keyed(db, worksheet) if c in columns]
+        if keyed:
+            positions = [list(columns).index(c) for c in keyed]
+            columns = list(columns) + [_KEY_PREFIX + c for c in keyed]
+            rows = [list(row) + [cell_key(row[i]) for i in positions] for row in rows]
+        if rows:
+            db.executemany(
+                f"INSERT INTO {_quote(worksheet)} ({', '.join(_quote(c) for c in columns)}) VALUES ({','.join('?' * len(columns))})",
+                rows,
+            )
+
+
+class MirroredBackend:
+    # 읽기/쓰기는 로컬 엔진(primary)에서 바로 끝내고, 같은 변경을 백그라운드 스레드가 구글 시트(mirror)에 뒤따라 씁니다.
+    # 시트 쪽에는 로컬에서 계산이 끝난 결과 값만 보내므로, 로컬 엔진이 항상 기준 데이터입니다.
+    #
+    # 시트에 아직 반영되지 않은 변경이 있는 워크시트는 상태 파일(state_path)에 남겨 둡니다.
+    # 재시도를 다 써도 실패했거나, 프로세스가 중간에 내려가 변경이 시트에 닿았는지 알 수 없는 워크시트는
+    # 로컬 내용 전체로 시트를 다시 씁니다(resync). resync 는 그 시점까지의 변경을 모두 담으므로 그 전에 쌓인 개별 변경은 건너뜁니다.
+    def __init__(self, primary, mirror, state_path=None, retry_after=60.0):
+        self.primary = primary
+        self.mirror = mirror
+        self.state_path = state_path
+        self.retry_after = retry_after
+        self.failures = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._jobs = queue.Queue()
+        self._seq = 0
+        self._queued = {}  # {순번: (워크시트, 넣은 시각)} 시트에 아직 반영되지 않은 작업
+        self._synced = {}  # {워크시트: 마지막 resync 가 담은 순번}
+        self._resync = set(self._load_state())
+        self._saved = set(self._resync)
+        with self._lock:
+            for worksheet in sorted(self._resync):
+                self._put(worksheet, None)
+        threading.Thread(target=self._run, name="sheet-mirror", daemon=True).start()
+
+    def bootstrap(self, worksheets):
+        # 로컬에 아직 없는 워크시트는 구글 시트에서 한 번 가져와 채웁니다.
+        for worksheet in worksheets:
+            if not self.primary.has_table(worksheet):
+                self.primary.overwrite(worksheet, self.mirror.read(worksheet))
+
+    def read(self, worksheet):
+        return self.primary.read(worksheet)
+
+    def overwrite(self, worksheet, df):
+        with self._lock:
+            self.primary.overwrite(worksheet, df)
+            self._put(worksheet, (self.mirror.overwrite, (worksheet, df.copy())))
+
+    def append_values(self, worksheet, values, columns):
+        with self._lock:
+            self.primary.append_values(worksheet, values, columns)
+            self._put(worksheet, (self.mirror.append_values, (worksheet, values, columns)))
+
+    def modify_rows(self, worksheet, key_col, updaters, version_col, base_versions, insert_missing, unique_cols=()):
+        # 중복 검사는 기준 데이터인 로컬 엔진에서만 합니다.
+        with self._lock:
+            results, stale = self.primary.modify_rows(worksheet, key_col, updaters, version_col, base_versions, insert_missing, unique_cols)
+            mirrored = {key: (lambda row, values=dict(values): values) for key, values in results.items()}
+            self._put(worksheet, (self.mirror.modify_rows, (worksheet, key_col, mirrored, None, {}, True)))
+        return results, stale
+
+    def status(self):
+        # 성능 패널용: 밀린 작업 수, 가장 오래 기다린 작업의 대기 시간(초), 누적 실패 수, 마지막 오류, 다시 맞출 워크시트
+        with self._lock:
+            oldest = min((queued_at for _, queued_at in self._queued.values()), default=None)
+            return {
+                "pending": len(self._queued),
+                "lag": 0.0 if oldest is None else time.time() - oldest,
+                "failures": self.failures,
+                "last_error": self.last_error,
+                "resync": sorted(self._resync),
+            }
+
+    def _put(self, worksheet, call):
+        # self._lock 안에서 부릅니다. call 이 None 이면 resync 작업입니다.
+        self._seq += 1
+        self._queued[self._seq] = (worksheet, time.time())
+        self._save_state()
+        self._jobs.put((self._seq, worksheet, call))
+
+    def _run(self):
+        while True:
+            seq, worksheet, call = self._jobs.get()
+            try:
+                if seq <= self._synced.get(worksheet, 0):
+                    pass  # 이미 resync 에 담긴 변경
+                elif call is None:
+                    self._resync_sheet(worksheet)
+                elif worksheet not in self._resync:
+                    fn, args = call
+                    retry_with_backoff(lambda: fn(*args))
+            except Exception as e:
+                logger.exception("구글 시트 미러 쓰기에 실패했습니다. %s 은(는) %.0f초 뒤 로컬 내용으로 다시 맞춥니다.", worksheet, self.retry_after)
+                METRICS.count("mirror_failures", worksheet=worksheet)
+                with self._lock:
+                    self.failures += 1
+                    self.last_error = f"{worksheet}: {e}"
+                    self._resync.add(worksheet)
+                timer = threading.Timer(self.retry_after, self._schedule_resync, (worksheet,))
+                timer.daemon = True
+                timer.start()
+            finally:
+                with self._lock:
+                    self._queued.pop(seq, None)
+                    self._save_state()
+
+    def _schedule_resync(self, worksheet):
+        with self._lock:
+            self._put(worksheet, None)
+
+    def _resync_sheet(self, worksheet):
+        # 잠금 안에서 읽으므로, 읽은 내용에는 지금까지 넣은 순번의 변경이 모두 들어 있습니다.
+        with self._lock:
+            df, seq = self.primary.read(worksheet), self._seq
+        with METRICS.span(f"mirror.resync.{worksheet}"):
+            retry_with_backoff(lambda: self.mirror.overwrite(worksheet, df))
+        METRICS.count("mirror_resyncs", worksheet=worksheet)
+        with self._lock:
+            self._synced[worksheet] = seq
+            self._resync.discard(worksheet)
+
+    # --- 상태 파일 ---
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return []
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                worksheets = json.load(f)
+        except ValueError:
+            return []
+        if worksheets:
+            logger.warning("구글 시트에 반영되지 않았을 수 있는 워크시트를 다시 맞춥니다: %s", ", ".join(worksheets))
+        return worksheets
+
+    def _save_state(self):
+        # self._lock 안에서 부릅니다. 목록이 바뀔 때만 씁니다.
+        dirty = {worksheet for worksheet, _ in self._queued.values()} | self._resync
+        if not self.state_path or dirty == self._saved:
+            return
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(sorted(dirty), f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_path)
+        self._saved = dirty
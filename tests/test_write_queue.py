@@ -0,0 +1,46 @@
+import json
+
+from write_queue import DONE, FAILED, WriteQueue, append_step
+
+
+class RecordingStorage:
+    def __init__(self):
+        self.appended = []
+
+    def append_rows(self, worksheet, rows, columns):
+        self.appended.extend((worksheet, row["내용"]) for row in rows)
+
+
+def _submit_record(job_id, content):
+    step = append_step("logs", [{"내용": content}], ["내용"])
+    return {"event": "submit", "job": {"id": job_id, "label": "", "steps": [step], "cursor": 0, "submitted_at": 0}}
+
+
+def test_replay_skips_jobs_whose_steps_all_applied(tmp_path):
+    # 마지막 단계 기록 뒤, 완료 기록 전에 내려간 작업은 다시 실행하지 않고 나머지 작업만 이어서 실행합니다.
+    journal = tmp_path / "write_queue.jsonl"
+    records = [
+        _submit_record("applied", "이미 반영됨"),
+        _submit_record("waiting", "남은 작업"),
+        {"event": "step", "id": "applied", "cursor": 1},
+    ]
+    journal.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records), encoding="utf-8")
+
+    storage = RecordingStorage()
+    queue = WriteQueue(storage, journal_path=str(journal), window=0.01)
+    assert queue.drain(timeout=5)
+    assert storage.appended == [("logs", "남은 작업")]
+    assert queue.status("applied") is None
+    assert queue.status("waiting")["status"] == DONE
+    assert journal.read_text(encoding="utf-8") == ""
+
+
+def test_unexpected_error_fails_only_that_job(tmp_path):
+    storage = RecordingStorage()
+    queue = WriteQueue(storage, journal_path=str(tmp_path / "write_queue.jsonl"), window=0.5)
+    broken = queue.submit([{"kind": "append", "worksheet": "logs", "rows": []}])
+    ok = queue.submit([append_step("logs", [{"내용": "정상"}], ["내용"])])
+    assert queue.drain(timeout=5)
+    assert queue.status(broken)["status"] == FAILED
+    assert queue.status(ok)["status"] == DONE
+    assert storage.appended == [("logs", "정상")]
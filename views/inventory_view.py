@@ -0,0 +1,317 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime, date, timedelta
+from common import (
+    LOG_COLUMNS, check_admin, get_store, load_inventory_data, load_inventory_repository, load_log_index,
+    load_search_index, load_stock_ledger, log_step, submit_write,
+)
+from export import EXCEL_MIME, frame_export
+from inventory import DuplicateItem, TIER_LOW, TIER_WARN, tier_styles
+from ledger import backfill_ledger, legacy_rows
+from metrics import METRICS
+from storage import cell_key
+from write_queue import modify_step
+
+# ==========================================
+# 메뉴 B: 📦 재고 관리 시스템
+# ==========================================
+is_admin = check_admin()
+today_val = date.today()
+store = get_store()
+
+col_title, col_refresh = st.columns([5, 1])
+with col_title:
+    st.title("📦 재고 관리 및 수불대장")
+with col_refresh:
+    st.write("") 
+    if st.button("🔄 실시간 현황 새로고침", use_container_width=True):
+        # 새로고침 버튼을 누를 때만 재고/로그 캐시를 비워 구글 시트를 다시 읽어옵니다.
+        store.invalidate("inventory")
+        store.invalidate("logs")
+        st.toast("최신 데이터를 성공적으로 동기화했습니다!")
+        st.rerun()
+
+with METRICS.span("load.inventory"):
+    df_inv, df_logs = load_inventory_data()
+
+sub_tab1, sub_tab2, sub_tab3, sub_tab4, sub_tab5 = st.tabs(["🔍 현재 재고 조회", "🔄 재고 입/출고", "➕ 신규 품목 등록", "📜 수정 내역 로그", "📈 시점 재고/소비량"])
+
+with sub_tab1:
+    st.subheader("🔍 실시간 물류 현황")
+    search_keyword = st.text_input("품목명/품목코드 검색 (초성 검색 가능)", key="inv_search")
+
+    if search_keyword:
+        # 입력값은 정규식이 아닌 글자 그대로 찾으며, 결과는 일치 정도가 높은 품목부터 보여 줍니다.
+        display_df = df_inv.iloc[load_search_index().search(search_keyword)]
+    else:
+        display_df = df_inv
+
+    if not display_df.empty:
+        low_stock_items = display_df.loc[display_df["_tier"] == TIER_LOW, "품목명"].tolist()
+        warning_stock_items = display_df.loc[display_df["_tier"] == TIER_WARN, "품목명"].tolist()
+
+        if low_stock_items:
+            st.error(f"🚨 **재고 고갈 위험 (10잔 이하):** {', '.join(low_stock_items)} -> 빠른 발주 필요!")
+        elif warning_stock_items:
+            st.warning(f"⚠️ **재고 부족 주의 (30잔 이하):** {', '.join(warning_stock_items)}")
+
+        cols_to_show = ["품목코드", "품목명", "수량", "보유 재고(박스 환산)", "제조 가능 음료수(추산)", "비고"]
+        existing_cols = [c for c in cols_to_show if c in display_df.columns]
+
+        final_view_df = display_df[existing_cols]
+        # 경고 색 스타일 계산은 표를 보낼 때 일어나므로 전송까지 한 구간으로 잽니다.
+        with METRICS.span("render.inventory_table"):
+            styled_df = final_view_df.style.apply(tier_styles, tiers=display_df["_tier"], axis=None)
+            st.dataframe(styled_df, use_container_width=True, hide_index=True)
+        st.caption("💡 **안내**: 제조 가능 음료수가 **10잔 이하**인 품목은 빨간색, **30잔 이하**는 노란색으로 강조 표시됩니다.", unsafe_allow_html=True)
+    else:
+        st.info("조회할 재고 데이터가 없습니다.")
+
+    st.divider()
+    st.metric(label="총 취급 품목 종수", value=len(df_inv))
+    inv_export_cols = [c for c in ["품목코드", "품목명", "수량", "보유 재고(박스 환산)", "제조 가능 음료수(추산)", "비고", "박스당수량", "개당음료수"] if c in df_inv.columns]
+    st.download_button(
+        label="📥 재고 현황 Excel",
+        data=frame_export(lambda: df_inv[inv_export_cols], "재고현황"),
+        file_name=f"재고현황_{today_val.strftime('%Y%m%d')}.xlsx",
+        mime=EXCEL_MIME,
+    )
+
+with sub_tab2:
+    st.subheader("🔄 재고 수량 변경 및 박스 계산기")
+    if not is_admin:
+        st.warning("🔒 수정 권한이 없습니다. 사이드바에 올바른 관리자 비밀번호를 입력해 주세요.")
+    elif df_inv.empty:
+        st.info("등록된 품목이 없습니다. 신규 품목을 먼저 등록해 주세요.")
+    else:
+        item_list = df_inv["품목명"].tolist()
+        selected_item = st.selectbox("수정할 품목을 선택하세요", item_list)
+
+        item_row = df_inv.iloc[load_inventory_repository().position_by_name(selected_item)]
+
+        p_box_qty = int(item_row["박스당수량"]) if pd.notna(item_row["박스당수량"]) else 1
+        p_drink_ratio = int(item_row["개당음료수"]) if pd.notna(item_row["개당음료수"]) else 0
+        current_qty = int(item_row["수량"]) if pd.notna(item_row["수량"]) else 0
+
+        ratio_info = f"{p_drink_ratio}잔 제조 가능" if p_drink_ratio > 0 else "❌ 계산 제외 품목"
+        st.info(f"💡 현재 보유 낱개: {current_qty}개 | [📦 1박스 = {p_box_qty}개입] | [🥤 기준: {ratio_info}]")
+
+        with st.form("inv_update_form"):
+            action = st.radio("작업 선택", ["입고 (+)", "출고 (-)"])
+            input_mode = st.radio("입력 방식 선택", ["📦 박스 개수로 계산해서 넣기", "✏️ 낱개 개수로 직접 넣기"])
+
+            col_calc1, col_calc2 = st.columns(2)
+            with col_calc1:
+                box_input = st.number_input("입력할 박스 개수", min_value=0, step=1, value=0)
+            with col_calc2:
+                each_input = st.number_input("입력할 낱개 개수", min_value=0, step=1, value=0)
+
+            reason = st.text_input("조정 사유", value="정기 수량 조정")
+            submit_btn = st.form_submit_button("시트 데이터 반영")
+
+            if submit_btn:
+                if input_mode == "📦 박스 개수로 계산해서 넣기":
+                    if p_box_qty <= 0:
+                        st.error("해당 품목의 마스터 박스당 수량 설정이 올바르지 않습니다.")
+                        st.stop()
+                    quantity_change = box_input * p_box_qty
+                    detail_text = f"{box_input}박스(총 {quantity_change}개)"
+                else:
+                    quantity_change = each_input
+                    detail_text = f"{each_input}개(낱개)"
+
+                if quantity_change <= 0:
+                    st.error("입력된 수량이 없습니다.")
+                    st.stop()
+
+                if action == "입고 (+)":
+                    signed_change = quantity_change
+                    if p_drink_ratio > 0:
+                        calc_drinks = quantity_change * p_drink_ratio
+                        log_msg = f"입고: {detail_text} | 추가 음료 생산량: +{calc_drinks}잔 추산 | 사유: {reason}"
+                    else:
+                        log_msg = f"입고: {detail_text} | [계산제외품목] | 사유: {reason}"
+                elif action == "출고 (-)":
+                    if current_qty < quantity_change:
+                        st.error(f"창고 재고가 부족합니다.")
+                        st.stop()
+                    signed_change = -quantity_change
+                    log_msg = f"출고: {detail_text} | 사유: {reason}"
+
+                # 세션의 수량(최대 3분 전 값)으로 덮어쓰지 않고, 시트의 최신 수량에 증감분만 다시 적용합니다.
+                # 수량 변경과 수불 로그는 한 작업으로 제출되어, 수량 변경이 거절되면 로그도 남지 않습니다.
+                item_code = cell_key(item_row["품목코드"])
+                movement = {
+                    "op": "add", "col": "수량", "amount": signed_change, "minimum": 0,
+                    "message": "창고 재고가 부족합니다. (최신 보유 수량: {latest}개)",
+                }
+                done_text = "{item} 상품이 {detail}만큼 {action} 완료되었습니다. (현재 {row[수량]}개)"
+                submit_write(
+                    [
+                        modify_step("inventory", "품목코드", {item_code: [movement]},
+                                    version_col="버전", base_versions={item_code: item_row.get("버전")}),
+                        log_step(df_logs, action, item_code, selected_item, signed_change, log_msg),
+                    ],
+                    f"{selected_item} {action[:2]}",
+                    success=done_text,
+                    stale="다른 관리자가 먼저 수정한 최신 수량을 기준으로 반영했습니다. " + done_text,
+                    fields={"item": selected_item, "detail": detail_text, "action": action[:2]},
+                )
+                st.rerun()
+
+with sub_tab3:
+    st.subheader("➕ 신규 품목 등록 및 마스터 규격 설정")
+    if not is_admin:
+        st.warning("🔒 수정 권한이 없습니다. 사이드바에 올바른 관리자 비밀번호를 입력해 주세요.")
+    else:
+        with st.form("inv_insert_form", clear_on_submit=True):
+            code = st.text_input("품목코드 (난독화 SKU 패턴 권장)")
+            name = st.text_input("품목명")
+
+            st.markdown("#### 📐 수량 및 음료수 추산 기준 정의")
+            col_m1, col_m2 = st.columns(2)
+            with col_m1:
+                box_qty = st.number_input("📦 1박스당 들어있는 기본 낱개 개수", min_value=1, step=1, value=1)
+            with col_m2:
+                is_calc_disabled = st.checkbox("컵, 빨대, 얼음 등 음료수 계산 제외 품목 설정")
+                drink_ratio = st.number_input("🥤 낱개 1개당 제조 가능한 음료 잔수 (위 체크 시 무시됨)", min_value=0, step=1, value=1)
+
+            st.divider()
+            qty = st.number_input("초기 보유 수량 (낱개 기준)", min_value=0, step=1, value=0)
+            remark = st.text_input("비고 항목")
+
+            add_btn = st.form_submit_button("신규 마스터 등록")
+
+            if add_btn:
+                final_ratio = 0 if is_calc_disabled else int(drink_ratio)
+
+                if not code or not name:
+                    st.error("품목코드와 품목명은 누락될 수 없습니다.")
+                else:
+                    try:
+                        load_inventory_repository().ensure_new(code, name)
+                    except DuplicateItem as e:
+                        st.error(str(e))
+                        st.stop()
+
+                    new_item = {
+                        "품목코드": code, 
+                        "품목명": name, 
+                        "수량": int(qty), 
+                        "비고": remark,
+                        "박스당수량": int(box_qty),
+                        "개당음료수": final_ratio
+                    }
+
+                    # 세션 사본에는 없어도 그 사이 다른 관리자가 같은 코드나 이름을 등록했을 수 있으므로 최신 시트 기준으로 한 번 더 확인합니다.
+                    # (품목 선택은 품목명 기준이므로 이름도 유일해야 합니다.)
+                    create_item = {"op": "create", "values": new_item, "message": "동일한 품목코드가 이미 존재합니다."}
+                    ratio_log_text = "계산제외" if final_ratio == 0 else f"{final_ratio}잔"
+                    submit_write(
+                        [
+                            modify_step("inventory", "품목코드", {code: [create_item]}, version_col="버전", insert_missing=True, unique_cols=["품목명"]),
+                            log_step(df_logs, "품목등록", code, name, int(qty), f"마스터 추가 -> 규격 [1박스={box_qty}개입 / 기준={ratio_log_text}] (초기보유: {qty}개)"),
+                        ],
+                        f"신규 품목 [{name}] 등록",
+                        success="새로운 물품 [{name}]의 마스터 규격이 성공적으로 등록되었습니다.",
+                        fields={"name": name},
+                    )
+                    st.rerun()
+
+# 로그 화면은 조각(fragment)으로 분리해, 필터/페이지를 바꿀 때 이 부분만 다시 그리고 현재 페이지 행만 보냅니다.
+@st.fragment
+def log_viewer():
+    # 조각만 다시 실행될 때도 최신 로그를 쓰도록 캐시에서 색인과 프레임을 함께 꺼냅니다.
+    log_index = load_log_index()
+    try:
+        df_logs = store.read("logs")
+    except:
+        df_logs = pd.DataFrame(columns=LOG_COLUMNS)
+    if not len(log_index):
+        st.info("기록된 변경 이력이 없습니다.")
+        return
+
+    first, last = log_index.span()
+    col_date, col_action, col_item = st.columns([2, 1, 1])
+    with col_date:
+        date_range = st.date_input("기간", value=(max(first.date(), last.date() - timedelta(days=30)), last.date()), min_value=first.date(), max_value=max(last.date(), today_val))
+    with col_action:
+        action_filter = st.selectbox("작업구분", ["전체"] + log_index.actions())
+    with col_item:
+        item_filter = st.selectbox("품목명", ["전체"] + log_index.items())
+
+    # 기간 선택 중(시작일만 고른 상태)에는 시작일 하루만 봅니다.
+    range_from, range_to = (date_range + (date_range[0],))[:2] if isinstance(date_range, tuple) and date_range else (first.date(), last.date())
+    positions = log_index.query(
+        start=datetime.combine(range_from, datetime.min.time()),
+        end=datetime.combine(range_to, datetime.max.time()),
+        item=None if item_filter == "전체" else item_filter,
+        action=None if action_filter == "전체" else action_filter,
+    )
+
+    col_size, col_page, col_count = st.columns([1, 1, 2])
+    with col_size:
+        page_size = st.selectbox("페이지당 행 수", [25, 50, 100], index=1)
+    pages = max(1, -(-len(positions) // page_size))
+    with col_page:
+        page = st.number_input("페이지", min_value=1, max_value=pages, value=1, step=1)
+    with col_count:
+        st.write("")
+        st.caption(f"총 {len(positions):,}건 · {int(page)}/{pages} 페이지 (최신순)")
+
+    positions = positions[positions < len(df_logs)]
+    page_rows = df_logs.iloc[positions[(int(page) - 1) * page_size:int(page) * page_size]]
+    if "변동량" in page_rows.columns:
+        page_rows = page_rows.assign(변동량=pd.to_numeric(page_rows["변동량"], errors="coerce").astype("Int64"))
+    st.dataframe(page_rows, use_container_width=True, hide_index=True)
+    st.download_button(
+        label=f"📥 조회 결과 {len(positions):,}건 Excel",
+        data=frame_export(lambda: df_logs.iloc[positions], "수불로그"),
+        file_name=f"수불로그_{range_from.strftime('%Y%m%d')}_{range_to.strftime('%Y%m%d')}.xlsx",
+        mime=EXCEL_MIME,
+    )
+
+with sub_tab4:
+    st.subheader("📜 재고 수불 및 변경 이력 로그")
+    with METRICS.span("render.log_viewer"):
+        log_viewer()
+
+with sub_tab5:
+    st.subheader("📈 시점 재고 및 품목별 소비량")
+    # st.tabs 는 모든 탭을 매번 그리므로, 원장(전체 로그 해석)은 펼쳤을 때만 만듭니다.
+    if st.toggle("📈 원장 조회 열기"):
+        with METRICS.span("load.stock_ledger"):
+            ledger = load_stock_ledger(df_inv)
+        legacy_count = int(legacy_rows(df_logs).sum())
+        if legacy_count:
+            st.caption(f"변동량이 기록되지 않은 구형 로그 {legacy_count}건은 '내용' 문구에서 수량을 읽어 계산합니다.")
+            if is_admin and st.button("🧾 구형 로그를 원장 형식으로 변환 저장"):
+                store.rewrite("logs", lambda df: backfill_ledger(df, df_inv))
+                st.toast("구형 로그에 품목코드/변동량/단위를 채워 저장했습니다.")
+                st.rerun()
+
+        st.markdown("#### 🕰️ 특정 시점 재고")
+        as_of = st.date_input("기준일 (해당 일자 마감 기준)", value=today_val.replace(day=1))
+        with METRICS.span("render.stock_at"):
+            stock_view = ledger.stock_at(datetime.combine(as_of, datetime.max.time()), df_inv)
+        stock_view["차이"] = stock_view["현재 수량"] - stock_view["시점 수량"]
+        st.dataframe(stock_view, use_container_width=True, hide_index=True)
+
+        st.markdown("#### 📉 기간별 소비량")
+        col_from, col_to, col_freq = st.columns([2, 2, 1])
+        with col_from:
+            range_from = st.date_input("시작일", value=today_val - timedelta(days=30))
+        with col_to:
+            range_to = st.date_input("종료일", value=today_val)
+        with col_freq:
+            freq_label = st.selectbox("집계 단위", ["일", "주", "월"])
+        range_start, range_end = datetime.combine(range_from, datetime.min.time()), datetime.combine(range_to, datetime.max.time())
+        with METRICS.span("render.movements"):
+            moves = ledger.movements(range_start, range_end)
+        if moves.empty:
+            st.info("선택한 기간에 기록된 입/출고가 없습니다.")
+        else:
+            st.dataframe(moves, use_container_width=True, hide_index=True)
+            usage = ledger.consumption(range_start, range_end, freq={"일": "D", "주": "W", "월": "M"}[freq_label])
+            if not usage.empty:
+                st.bar_chart(usage)
@@ -0,0 +1,272 @@
+import streamlit as st
+import pandas as pd
+from datetime import date
+from html import escape
+from common import WORKER_COLORS, check_admin, load_calendar, load_roster_stats, load_schedule_data, submit_write
+from export import EXCEL_MIME, schedule_export
+from metrics import METRICS
+from write_queue import modify_step
+
+# ==========================================
+# 메뉴 A: 📅 근무 일정 관리
+# ==========================================
+# 달력/카드 화면에만 쓰이는 CSS 는 이 페이지에서만 넣습니다.
+st.markdown("""
+    <style>
+    .today-box { background-color: #fff9db !important; border: 2px solid #fcc419 !important; }
+    .mobile-card {
+        border: 1px solid #ddd;
+        border-radius: 10px;
+        padding: 15px;
+        margin-bottom: 10px;
+        background-color: white;
+        box-shadow: 2px 2px 5px rgba(0,0,0,0.05);
+    }
+    .worker-tag {
+        display: inline-block;
+        padding: 4px 10px;
+        border-radius: 6px;
+        font-size: 13px;
+        font-weight: bold;
+        margin: 2px;
+        color: black;
+        border: 1px solid rgba(0,0,0,0.1);
+    }
+    .today-badge {
+        background-color: #fcc419;
+        color: black;
+        font-size: 0.7rem;
+        padding: 2px 6px;
+        border-radius: 4px;
+        margin-left: 5px;
+        display: inline-block;
+    }
+    .date-header {
+        font-size: 1.2rem;
+        font-weight: bold;
+        border-bottom: 2px solid #f1f3f5;
+        margin-bottom: 10px;
+    }
+    .cal-grid {
+        display: grid;
+        grid-template-columns: repeat(7, 1fr);
+        gap: 6px;
+    }
+    .cal-head { text-align: center; font-weight: bold; }
+    .cal-cell {
+        min-height: 150px;
+        border: 1px solid #dee2e6;
+        padding: 10px;
+        background-color: #ffffff;
+        border-radius: 8px;
+    }
+    .cal-pad { border: none; background-color: transparent; }
+    .cal-caption { color: #868e96; font-size: 0.85rem; margin-top: 6px; }
+    .cal-staged { outline: 2px dashed #fd7e14; outline-offset: -2px; }
+    </style>
+    """, unsafe_allow_html=True)
+
+
+is_admin = check_admin()
+today_val = date.today()
+
+with METRICS.span("load.schedule"):
+    schedule_index = load_schedule_data()
+# 연도 선택 범위: 기록이 있는 가장 이른 해(또는 작년) ~ 내년
+first_year = min(schedule_index.start.year, today_val.year - 1)
+year_options = list(range(first_year, today_val.year + 2))
+calendar_table = load_calendar(year_options[0], year_options[-1])
+
+view_mode = st.sidebar.radio("화면 모드", ["📅 달력 보기 (PC)", "📱 리스트 보기 (모바일)"], index=1)
+selected_year = st.sidebar.selectbox("연도 선택", year_options, index=year_options.index(today_val.year))
+selected_month = st.sidebar.selectbox("월 선택", list(range(1, 13)), index=today_val.month - 1)
+filter_name = st.sidebar.selectbox("🔍 근무자 필터링", ["전체보기"] + list(WORKER_COLORS.keys()))
+if is_admin and st.session_state.get("schedule_staged"):
+    st.sidebar.warning(f"저장되지 않은 근무 변경 {len(st.session_state['schedule_staged'])}일")
+
+# 관리자가 고친 날짜는 바로 시트에 쓰지 않고 세션의 저장 대기 목록에 모아 두었다가, 저장 버튼 한 번으로 반영합니다.
+# {날짜: (새 근무자 목록, 고칠 당시 불러와 있던 목록)} — 달을 옮겨 다니며 고쳐도 유지됩니다.
+staged = st.session_state.setdefault("schedule_staged", {})
+
+def save_to_sheets(changes):
+    # changes 의 날짜들을 하나의 쓰기 작업으로 제출합니다 (쓰기 큐가 한 번의 요청으로 반영).
+    # 불러온 이후 다른 관리자가 같은 날짜를 고쳤다면(충돌) 덮어쓰지 않고,
+    # 이쪽에서 추가/제외한 인원만 시트의 최신 값에 다시 적용한 뒤 완료 알림에서 그 날짜를 알려 줍니다.
+    rows = {
+        d_str: [{
+            "op": "merge_list", "col": "workers",
+            "added": [w for w in new if w not in base],
+            "removed": [w for w in base if w not in new],
+            "base": list(base),
+        }]
+        for d_str, (new, base) in changes.items()
+    }
+    submit_write(
+        [modify_step("Sheet1", "date", rows, insert_missing=True)],
+        f"근무 배정 {len(rows)}일 저장",
+        success="근무 배정을 저장했습니다.",
+        conflict="⚠️ 다른 관리자가 먼저 수정한 날짜가 있어 최신 값에 이번 변경만 반영했습니다: {keys}",
+    )
+
+# 이번 달 날짜 정보는 달력 표의 구간 하나, 근무자/필터/통계는 마스크 배열 하나로 모두 계산합니다.
+month_days_df = calendar_table.month(selected_year, selected_month)
+start_pad = int(month_days_df["grid_col"].iloc[0])
+month_masks = schedule_index.month(selected_year, selected_month)
+if filter_name == "전체보기":
+    month_match = [True] * len(month_masks)
+else:
+    month_match = schedule_index.matches(month_masks, filter_name)
+
+col_cal, col_stat = st.columns([4, 1])
+
+# 하루마다 위젯을 만들지 않고, 한 달치 화면을 HTML 한 덩어리로 만들어 한 번에 보냅니다.
+def worker_tags(names):
+    return "".join(f"<span class='worker-tag' style='background-color:{WORKER_COLORS.get(n, '#f1f3f5')}'>{escape(n)}</span>" for n in names)
+
+def month_days():
+    # (일, 날짜 행, 배정 인원, 필터 일치, 저장 대기 여부). 저장 대기 중인 날짜는 대기 중인 값으로 보여 줍니다.
+    for d, day in enumerate(month_days_df.itertuples(index=False), start=1):
+        assigned, is_match = schedule_index.decode(month_masks[d - 1]), month_match[d - 1]
+        is_staged = day.iso in staged
+        if is_staged:
+            assigned = staged[day.iso][0]
+            is_match = (filter_name == "전체보기") or (filter_name in assigned)
+        yield d, day, assigned, is_match, is_staged
+
+def render_list_html():
+    cards = []
+    for d, day, assigned, is_match, is_staged in month_days():
+        is_off = day.is_off
+        is_today = (day.date == today_val)
+        card_style = f"opacity: {'1.0' if is_match else '0.3'}; {'border:2px solid #fcc419; background-color:#fff9db;' if is_today else ''}"
+        today_badge = "<span class='today-badge'>TODAY</span>" if is_today else ""
+        if is_off:
+            body = "<div class='cal-caption'>휴무</div>"
+        elif assigned:
+            body = f"<div>{worker_tags(assigned)}</div>"
+        else:
+            body = "<div class='cal-caption'>배정 인원 없음</div>"
+        cards.append(
+            f"<div class='mobile-card {'cal-staged' if is_staged else ''}' style='{card_style}'>"
+            f"<div style='color:{'red' if is_off else 'black'}; font-weight:bold; font-size:1.1rem;'>"
+            f"{d}일 ({day.weekday_label}) {escape(day.holiday)} {today_badge}</div>"
+            f"{body}</div>"
+        )
+    return "".join(cards)
+
+def render_calendar_html():
+    cells = [f"<div class='cal-head'>{day}</div>" for day in ["일", "월", "화", "수", "목", "금", "토"]]
+    cells += ["<div class='cal-cell cal-pad'></div>"] * start_pad
+    for d, day, assigned, is_match, is_staged in month_days():
+        is_off = day.is_off
+        box_class = "today-box" if day.date == today_val else ""
+        dim_style = f"opacity: {'1.0' if is_match else '0.3'};"
+        tags = "" if is_off else worker_tags(assigned)
+        cells.append(
+            f"<div class='cal-cell {'cal-staged' if is_staged else ''}' style='{dim_style}'>"
+            f"<div class='date-header {box_class}' style='color: {'red' if is_off else 'black'};'>{d}</div>{tags}</div>"
+        )
+    return f"<div class='cal-grid'>{''.join(cells)}</div>"
+
+with col_cal:
+    st.title(f"{selected_year}년 {selected_month}월 근무현황")
+
+    if view_mode == "📱 리스트 보기 (모바일)":
+        with METRICS.span("render.month_list"):
+            st.markdown(render_list_html(), unsafe_allow_html=True)
+    else: # PC 달력 보기
+        with METRICS.span("render.month_calendar"):
+            st.markdown(render_calendar_html(), unsafe_allow_html=True)
+
+    if is_admin:
+        # 관리자는 날짜마다 multiselect 를 두는 대신 한 달치 표 하나에서 체크해 저장 대기 목록에 담고,
+        # 여러 달의 변경을 모아 저장 버튼 한 번으로 바뀐 날짜만 반영합니다.
+        st.divider()
+        st.subheader("✏️ 근무 배정 편집")
+        work_days = [(d, day, assigned) for d, day, assigned, _, _ in month_days() if not day.is_off]
+        editor_df = pd.DataFrame({
+            "날짜": [day.iso for _, day, _ in work_days],
+            "요일": [day.weekday_label for _, day, _ in work_days],
+        })
+        for name in WORKER_COLORS:
+            editor_df[name] = [name in assigned for _, _, assigned in work_days]
+
+        with st.form(f"schedule_edit_{selected_year}_{selected_month}"):
+            edited_df = st.data_editor(
+                editor_df,
+                hide_index=True,
+                use_container_width=True,
+                disabled=["날짜", "요일"],
+                column_config={name: st.column_config.CheckboxColumn(name) for name in WORKER_COLORS},
+            )
+            stage_btn = st.form_submit_button("📥 변경 담기")
+
+        if stage_btn:
+            for (d, _, shown), row in zip(work_days, edited_df.to_dict("records")):
+                base = schedule_index.decode(month_masks[d - 1])
+                # 표에 없는(등록되지 않은) 근무자는 그대로 둡니다.
+                new = [n for n in WORKER_COLORS if row[n]] + [n for n in shown if n not in WORKER_COLORS]
+                if set(new) == set(base):
+                    staged.pop(row["날짜"], None)
+                else:
+                    staged[row["날짜"]] = (new, staged[row["날짜"]][1] if row["날짜"] in staged else base)
+            st.rerun()
+
+        if staged:
+            st.warning(f"💾 저장 대기 중인 변경: {len(staged)}일 ({', '.join(sorted(staged))})")
+            col_commit, col_discard = st.columns(2)
+            if col_commit.button("💾 모두 저장", use_container_width=True):
+                save_to_sheets(staged)
+                staged.clear()
+                st.rerun()
+            if col_discard.button("↩️ 변경 취소", use_container_width=True):
+                staged.clear()
+                st.rerun()
+
+with col_stat:
+    st.subheader("📊 통계")
+    month_counts = schedule_index.counts(month_masks)
+
+    for name, color in WORKER_COLORS.items():
+        if filter_name != "전체보기" and name != filter_name: continue
+        count = month_counts.get(name, 0)
+        st.markdown(f"<div style='background-color:{color}; padding:10px; border-radius:5px; margin-bottom:5px; font-weight:bold; color:black;'>{name}: {count}회</div>", unsafe_allow_html=True)
+
+    st.divider()
+    st.subheader("💾 내보내기")
+    # 파일은 버튼을 누를 때만 만들어지고, 같은 내용이면 캐시된 파일을 그대로 보냅니다.
+    st.download_button(
+        label="📊 Excel 다운로드",
+        data=schedule_export(schedule_index, month_days_df, sheet_name=f"{selected_month}월"),
+        file_name=f"근무표_{selected_year}년_{selected_month}월.xlsx",
+        mime=EXCEL_MIME,
+    )
+    st.download_button(
+        label=f"📆 {selected_year}년 전체 Excel",
+        data=schedule_export(
+            schedule_index, calendar_table.span(date(selected_year, 1, 1), date(selected_year, 12, 31)), sheet_name=f"{selected_year}년",
+            extra_sheets=lambda: load_roster_stats().report(selected_year, list(WORKER_COLORS)),
+        ),
+        file_name=f"근무표_{selected_year}년.xlsx",
+        mime=EXCEL_MIME,
+    )
+
+# 연간 통계는 펼쳤을 때만 그립니다. 숫자는 전체 기록에서 한 번 계산되어 캐시된 통계 엔진에서 꺼냅니다.
+st.divider()
+if st.toggle(f"📈 {selected_year}년 근무 통계 및 공정성 리포트"):
+    with METRICS.span("load.roster_stats"):
+        roster_stats = load_roster_stats()
+    stat_tabs = st.tabs(["월별", "분기별", "요일 분포", "연속 근무", "공정성"])
+    with stat_tabs[0]:
+        st.dataframe(roster_stats.counts("M", selected_year), use_container_width=True)
+    with stat_tabs[1]:
+        st.dataframe(roster_stats.counts("Q", selected_year), use_container_width=True)
+    with stat_tabs[2]:
+        st.dataframe(roster_stats.weekday_distribution(selected_year), use_container_width=True)
+    with stat_tabs[3]:
+        st.dataframe(roster_stats.streaks(selected_year), use_container_width=True, hide_index=True)
+    with stat_tabs[4]:
+        fairness = roster_stats.fairness(selected_year, list(WORKER_COLORS))
+        st.dataframe(fairness, use_container_width=True, hide_index=True)
+        if len(fairness) and fairness["총 배정"].max() > 0:
+            st.caption(f"최다/최소 배정 차이: {fairness['총 배정'].max() - fairness['총 배정'].min()}회")
@@ -0,0 +1,351 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from metrics import METRICS
+from storage import cell_key, chain_updaters, is_retryable, retry_with_backoff, row_updater, to_cell, to_int
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# 백그라운드 쓰기 큐
+# ==========================================
+# 화면 코드는 쓰기를 직접 실행하지 않고 작업(job)으로 제출한 뒤 바로 다음 화면으로 넘어갑니다.
+# 작업은 순서가 있는 단계(step) 목록이며, 한 작업의 단계는 앞 단계가 성공해야 다음 단계가 실행됩니다.
+# (예: 재고 수량 변경 -> 수불 로그 추가. 수량 변경이 거절되면 로그도 남지 않습니다.)
+#
+# 워커 스레드는 짧은 시간(window) 동안 들어온 작업을 모아, 같은 워크시트에 대한 같은 종류의 단계를
+# 요청 한 번으로 합쳐 보냅니다. 할당량 초과 같은 일시적 오류는 지수 백오프로 다시 시도하고,
+# 합친 요청이 충돌(WriteConflict)로 거절되면 작업별로 나눠 다시 보내 해당 작업만 실패 처리합니다.
+#
+# 앞 단계가 반영된 뒤 다음 단계가 실패하면(예: 수량은 바뀌었는데 로그 추가가 거절됨) 반영된 단계를 되돌립니다.
+# 증감(add)처럼 되돌릴 수 있는 단계는 반대 증감을 보내 FAILED 로 끝내고, 되돌릴 수 없으면 PARTIAL(일부만 반영)로 남겨 알립니다.
+#
+# 제출된 작업과 완료된 단계는 저널 파일(JSONL)에 기록되어, 프로세스가 중간에 내려가도 다음 시작 때 남은 단계부터 이어서 실행됩니다.
+# (단계 반영 직후 저널 기록 전에 내려가면 그 단계가 한 번 더 실행될 수 있습니다.)
+
+PENDING, DONE, FAILED, PARTIAL = "pending", "done", "failed", "partial"
+
+
+def modify_step(worksheet, key_col, rows, version_col=None, base_versions=None, insert_missing=False, unique_cols=()):
+    # rows 는 {키값: [행 변경 명세, ...]} 입니다 (storage.row_updater 참고). unique_cols 는 storage.modify_rows 참고.
+    return {
+        "kind": "modify",
+        "worksheet": worksheet,
+        "key_col": key_col,
+        "rows": {cell_key(k): list(specs) for k, specs in rows.items()},
+        "version_col": version_col,
+        "base_versions": {cell_key(k): to_int(v) for k, v in (base_versions or {}).items()},
+        "insert_missing": insert_missing,
+        "unique_cols": list(unique_cols),
+    }
+
+
+def append_step(worksheet, rows, columns):
+    return {
+        "kind": "append",
+        "worksheet": worksheet,
+        "rows": [{c: to_cell(row.get(c, "")) for c in columns} for row in rows],
+        "columns": list(columns),
+    }
+
+
+class WriteQueue:
+    def __init__(self, storage, journal_path=None, window=0.3, retry_after=30.0, keep_finished=500, sleep=time.sleep):
+        self.storage = storage
+        self.journal_path = journal_path
+        self.window = window
+        self.retry_after = retry_after
+        self.keep_finished = keep_finished
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._pending = queue.Queue()
+        for job in self._replay_journal():
+            self._pending.put(job)
+        threading.Thread(target=self._run, name="write-queue", daemon=True).start()
+
+    # --- 제출 / 상태 조회 ---
+    def submit(self, steps, label=""):
+        job = {
+            "id": uuid.uuid4().hex,
+            "label": label,
+            "steps": list(steps),
+            "cursor": 0,
+            "status": PENDING,
+            "error": None,
+            "conflicts": [],
+            "stale": [],
+            "rows": {},
+            "submitted_at": time.time(),
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._journal({"event": "submit", "job": _journal_job(job)})
+        self._pending.put(job)
+        return job["id"]
+
+    def status(self, job_id):
+        # 작업 상태 사본. 모르는 작업(오래되어 정리됐거나 다른 프로세스의 작업)은 None 입니다.
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else dict(job)
+
+    def pending_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["status"] == PENDING)
+
+    def drain(self, timeout=10.0):
+        # 대기 중인 작업이 모두 끝날 때까지 기다립니다 (스크립트/점검용).
+        deadline = time.monotonic() + timeout
+        while self.pending_count() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self.pending_count() == 0
+
+    # --- 워커 ---
+    def _run(self):
+        while True:
+            batch = [self._pending.get()]
+            deadline = time.monotonic() + self.window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._process(batch)
+            except Exception:
+                logger.exception("쓰기 큐 처리 중 예기치 못한 오류가 발생했습니다.")
+            self._compact_if_idle()
+
+    def _process(self, batch):
+        # 각 작업의 "다음 단계"끼리 묶어 보내는 것을 모든 작업이 끝날 때까지 반복합니다.
+        # 예기치 못한 오류는 해당 작업만 실패로 끝내, 같은 묶음의 다른 작업이 대기 상태로 남지 않게 합니다.
+        active = [job for job in batch if job["status"] == PENDING]
+        while active:
+            groups = OrderedDict()
+            for job in active:
+                if job["cursor"] >= len(job["steps"]):
+                    with self._lock:
+                        self._finish(job, DONE)
+                    continue
+                try:
+                    groups.setdefault(_group_key(job["steps"][job["cursor"]]), []).append(job)
+                except Exception as e:
+                    logger.exception("쓰기 작업 %s 의 단계를 읽을 수 없습니다.", job["id"])
+                    self._fail(job, e)
+            for jobs in groups.values():
+                try:
+                    self._apply_group(jobs)
+                except Exception as e:
+                    logger.exception("쓰기 작업 처리 중 예기치 못한 오류가 발생했습니다.")
+                    for job in jobs:
+                        if job["status"] == PENDING and not job.get("_waiting"):
+                            self._fail(job, e)
+            active = [job for job in active if job["status"] == PENDING and not job.get("_waiting")]
+
+    def _apply_group(self, jobs):
+        head = jobs[0]["steps"][jobs[0]["cursor"]]
+        METRICS.count("write_queue_groups", kind=head["kind"], worksheet=head["worksheet"])
+        METRICS.count("write_queue_steps", len(jobs), kind=head["kind"], worksheet=head["worksheet"])
+        try:
+            with METRICS.span(f"write_queue.{head['kind']}.{head['worksheet']}"):
+                outcome = retry_with_backoff(lambda: self._write(jobs), sleep=self._sleep)
+        except Exception as e:
+            if len(jobs) > 1 and not is_retryable(e):
+                # 합친 요청이 거절되면 작업별로 다시 보내 문제가 된 작업만 골라냅니다.
+                for job in jobs:
+                    self._apply_group([job])
+                return
+            for job in jobs:
+                self._fail(job, e)
+            return
+        for job in jobs:
+            conflicts, stale, rows = outcome[job["id"]]
+            with self._lock:
+                job["conflicts"] = sorted(set(job["conflicts"]) | set(conflicts))
+                job["stale"] = sorted(set(job["stale"]) | set(stale))
+                job["rows"].update(rows)
+                job["error"] = None
+                job["cursor"] += 1
+                self._journal({"event": "step", "id": job["id"], "cursor": job["cursor"]})
+                if job["cursor"] == len(job["steps"]):
+                    self._finish(job, DONE)
+
+    def _write(self, jobs):
+        # jobs 의 현재 단계(모두 같은 묶음)를 요청 한 번으로 보냅니다. 반환값: {작업 id: (충돌 키, stale 키, 반영된 행)}
+        steps = [job["steps"][job["cursor"]] for job in jobs]
+        head = steps[0]
+        if head["kind"] == "append":
+            rows = [row for step in steps for row in step["rows"]]
+            self.storage.append_rows(head["worksheet"], rows, head["columns"])
+            return {job["id"]: ([], [], {}) for job in jobs}
+
+        # 같은 키를 여러 작업이 고치면 제출 순서대로 이어서 적용합니다. 행 버전은 처음 제출한 작업의 기준으로 비교합니다.
+        fns, base_versions, owners, notes = OrderedDict(), {}, {}, {}
+        for job, step in zip(jobs, steps):
+            for key, specs in step["rows"].items():
+                key_notes = notes.setdefault((job["id"], key), [])
+                fns.setdefault(key, []).extend(row_updater(spec, key_notes, head["key_col"]) for spec in specs)
+                if key in step["base_versions"]:
+                    base_versions.setdefault(key, step["base_versions"][key])
+                owners.setdefault(key, []).append(job["id"])
+        results, stale = self.storage.modify_rows(
+            head["worksheet"], head["key_col"],
+            {key: chain_updaters(key_fns) for key, key_fns in fns.items()},
+            version_col=head["version_col"], base_versions=base_versions, insert_missing=head["insert_missing"],
+            unique_cols=head.get("unique_cols", []),
+        )
+        stale = {cell_key(k) for k in stale}
+        outcome = {}
+        for job, step in zip(jobs, steps):
+            keys = list(step["rows"])
+            outcome[job["id"]] = (
+                [k for k in keys if notes[(job["id"], k)]],
+                [k for k in keys if k in stale or owners[k][0] != job["id"]],
+                {k: results[k] for k in keys if k in results},
+            )
+        return outcome
+
+    def _fail(self, job, error):
+        if is_retryable(error):
+            with self._lock:
+                # 백오프를 다 써도 안 되는 일시적 오류는 실패로 끝내지 않고 잠시 뒤 남은 단계부터 다시 시도합니다.
+                job["error"] = str(error)
+                job["_waiting"] = True
+                METRICS.count("write_queue_requeued")
+                logger.warning("쓰기 작업 %s 을(를) %.0f초 뒤 다시 시도합니다: %s", job["id"], self.retry_after, error)
+                timer = threading.Timer(self.retry_after, self._requeue, (job,))
+                timer.daemon = True
+                timer.start()
+                return
+        status, message = FAILED, str(error)
+        if job["cursor"]:
+            status, message = self._undo(job, message)
+        with self._lock:
+            job["error"] = message
+            self._finish(job, status)
+
+    def _undo(self, job, message):
+        # 이미 반영된 앞 단계를 뒤에서부터 되돌립니다. 반환값: (끝 상태, 알림 문구)
+        applied = job["steps"][:job["cursor"]]
+        failed = job["steps"][job["cursor"]]
+        message = f"{_describe(failed)} 단계가 실패했습니다: {message}"
+        undo = [_reverse_step(step) for step in reversed(applied)]
+        if any(step is None for step in undo):
+            logger.error("쓰기 작업 %s 은(는) %s만 반영된 채 끝났습니다.", job["id"], ", ".join(map(_describe, applied)))
+            return PARTIAL, f"{', '.join(map(_describe, applied))}은(는) 반영되었지만 {message}"
+        # 되돌리기 도중 프로세스가 내려가면 저널 재실행 때 다시 되돌리지 않도록 먼저 기록합니다.
+        self._journal({"event": "undo", "id": job["id"]})
+        try:
+            for step in undo:
+                temp = {"id": job["id"], "steps": [step], "cursor": 0}
+                retry_with_backoff(lambda: self._write([temp]), sleep=self._sleep)
+        except Exception as e:
+            logger.exception("쓰기 작업 %s 의 앞 단계를 되돌리지 못했습니다.", job["id"])
+            return PARTIAL, f"{', '.join(map(_describe, applied))}은(는) 반영되었고 되돌리기에도 실패했습니다 ({e}). {message}"
+        METRICS.count("write_queue_undone")
+        return FAILED, f"{message} (앞 단계 변경은 되돌렸습니다)"
+
+    def _requeue(self, job):
+        job.pop("_waiting", None)
+        self._pending.put(job)
+
+    def _finish(self, job, status):
+        job["status"] = status
+        METRICS.count("write_queue_jobs", status=status)
+        METRICS.observe("write_queue.latency", time.time() - job["submitted_at"])
+        self._journal({"event": "done", "id": job["id"], "status": status, "error": job["error"]})
+        finished = [k for k, j in self._jobs.items() if j["status"] != PENDING]
+        for key in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[key]
+
+    # --- 저널 ---
+    def _journal(self, record):
+        if not self.journal_path:
+            return
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay_journal(self):
+        # 끝나지 않은 작업을 저널에서 되살려 남은 단계부터 다시 실행하도록 돌려줍니다.
+        if not self.journal_path:
+            return []
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        jobs = OrderedDict()
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # 기록 도중 내려가 잘린 마지막 줄
+                    if record["event"] == "submit":
+                        jobs[record["job"]["id"]] = record["job"]
+                    elif record["id"] in jobs:
+                        if record["event"] == "step":
+                            jobs[record["id"]]["cursor"] = record["cursor"]
+                        else:
+                            if record["event"] == "undo":
+                                # 되돌리기가 끝났는지 알 수 없으므로 다시 실행하지 않고 기록만 남깁니다.
+                                logger.error("쓰기 작업 %s 은(는) 되돌리는 도중 중단되었습니다. 시트를 직접 확인해 주세요.", record["id"])
+                            del jobs[record["id"]]
+        pending = []
+        for job in jobs.values():
+            if job["cursor"] >= len(job["steps"]):
+                # 마지막 단계까지 반영된 뒤 완료 기록 전에 내려간 작업은 이미 끝난 것입니다.
+                logger.info("쓰기 작업 %s 은(는) 모든 단계가 반영되어 있어 다시 실행하지 않습니다.", job["id"])
+                continue
+            job.update(status=PENDING, error=None, conflicts=[], stale=[], rows={})
+            self._jobs[job["id"]] = job
+            pending.append(job)
+        if pending:
+            logger.warning("저널에서 끝나지 않은 쓰기 작업 %d건을 이어서 실행합니다.", len(pending))
+        self._rewrite_journal(pending)
+        return pending
+
+    def _compact_if_idle(self):
+        with self._lock:
+            if not any(job["status"] == PENDING for job in self._jobs.values()):
+                self._rewrite_journal([])
+
+    def _rewrite_journal(self, jobs):
+        if not self.journal_path:
+            return
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for job in jobs:
+                f.write(json.dumps({"event": "submit", "job": _journal_job(job)}, ensure_ascii=False, default=str) + "\n")
+        os.replace(tmp, self.journal_path)
+
+
+def _group_key(step):
+    if step["kind"] == "append":
+        return ("append", step["worksheet"], tuple(step["columns"]))
+    return ("modify", step["worksheet"], step["key_col"], step["version_col"], step["insert_missing"], tuple(step.get("unique_cols", ())))
+
+
+def _describe(step):
+    return f"{step['worksheet']} {'행 추가' if step['kind'] == 'append' else '수정'}"
+
+
+def _reverse_step(step):
+    # 증감(add)만으로 이뤄진 수정 단계는 반대 증감으로 되돌릴 수 있습니다. 그 밖의 단계는 None 입니다.
+    if step["kind"] != "modify" or any(spec["op"] != "add" for specs in step["rows"].values() for spec in specs):
+        return None
+    rows = {key: [{"op": "add", "col": spec["col"], "amount": -spec["amount"]} for spec in reversed(specs)] for key, specs in step["rows"].items()}
+    return modify_step(step["worksheet"], step["key_col"], rows, version_col=step["version_col"])
+
+
+def _journal_job(job):
+    return {k: job[k] for k in ("id", "label", "steps", "cursor", "submitted_at")}